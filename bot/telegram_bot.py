@@ -2,16 +2,135 @@
 Main Telegram bot class with professional, user-friendly interface.
 """
 import logging
-import json
-import aiofiles
 import asyncio
+import copy
+import os
 import re
+import sys
+from cachetools import LRUCache, TTLCache
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
-from config import CONFIG_FILE, API_KEYS_FILE
+from config import CONFIG_FILE, API_KEYS_FILE, SUPPORTED_EXCHANGES
+from utils.json_io import read_json, write_json
+from utils.security import encrypt_api_keys
 
 logger = logging.getLogger(__name__)
 
+# Abandoned setup flows expire instead of living in memory forever
+USER_STATE_MAX_USERS = 10_000
+USER_STATE_TTL_SECONDS = 900
+# Number of recently edited messages remembered to skip no-op edits
+EDITED_MESSAGES_MAX = 10_000
+# Alerts waiting to be sent; past this the oldest are dropped
+ALERT_QUEUE_MAX = 100
+# How long shutdown waits for queued alerts to go out
+ALERT_DRAIN_TIMEOUT_SECONDS = 5
+
+_PAIR_RE = re.compile(r'^[A-Z0-9]+/USDT$')
+_SPLIT_RE = re.compile(r'[,\n]+')
+# "Label: value" lines of the API credentials message
+_CRED_RE = re.compile(r'^[^\S\n]*(?P<key>[^:\n]+?)[^\S\n]*:[^\S\n]*(?P<value>\S.*?)[^\S\n]*$', re.MULTILINE)
+
+# Display names for the supported exchanges, computed once
+_EXCH_UPPER = {e: e.upper() for e in SUPPORTED_EXCHANGES}
+_CONNECTED_TMPL = "✅ *%s Connected!*\n\nYour exchange is now ready to use."
+EXCHANGE_CONNECTED_TEXTS = {e: _CONNECTED_TMPL % upper for e, upper in _EXCH_UPPER.items()}
+
+# Fixed-shape menu texts, filled with %-formatting on each render
+_SETUP_TMPL = (
+    "🔧 *Setup & Configuration*\n\n"
+    "Connected Exchanges: %d\n"
+    "Trading Pairs: %d\n\n"
+    "What would you like to configure?"
+)
+_MONITOR_TMPL = (
+    "📈 *Continuous Monitoring*\n\n"
+    "%s\n\n"
+    "Scan Interval: %ss\n"
+    "Auto-Execute: %s\n\n"
+    "Start monitoring to automatically scan for opportunities."
+)
+
+
+# Static keyboards, built once at import instead of on every button press
+START_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔧 Setup", callback_data="menu_setup")],
+    [InlineKeyboardButton("💰 Trading", callback_data="menu_trading")],
+    [InlineKeyboardButton("📊 Portfolio", callback_data="menu_portfolio")],
+    [InlineKeyboardButton("📈 Monitor", callback_data="menu_monitor")],
+    [InlineKeyboardButton("ℹ️ Help", callback_data="help")]
+])
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔧 Setup", callback_data="menu_setup")],
+    [InlineKeyboardButton("💰 Trading", callback_data="menu_trading")],
+    [InlineKeyboardButton("📊 Portfolio", callback_data="menu_portfolio")],
+    [InlineKeyboardButton("📈 Monitor", callback_data="menu_monitor")]
+])
+SETUP_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("➕ Add Exchange", callback_data="setup_exchanges")],
+    [InlineKeyboardButton("📝 Configure Pairs", callback_data="setup_pairs")],
+    [InlineKeyboardButton("⚙️ Settings", callback_data="setup_config")],
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+TRADING_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔍 Scan Now", callback_data="scan_now")],
+    [InlineKeyboardButton("📋 View Opportunities", callback_data="view_opportunities")],
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+PORTFOLIO_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💵 View Balances", callback_data="view_balances")],
+    [InlineKeyboardButton("📦 Positions", callback_data="view_positions")],
+    [InlineKeyboardButton("📊 Check Drift", callback_data="check_drift")],
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+MONITOR_ACTIVE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⏸ Stop Monitoring", callback_data="stop_monitor")],
+    [InlineKeyboardButton("📊 Status", callback_data="monitor_status")],
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+MONITOR_STOPPED_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("▶️ Start Monitoring", callback_data="start_monitor")],
+    [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
+])
+EXCHANGE_SELECT_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("Binance", callback_data="exch_binance")],
+    [InlineKeyboardButton("OKX", callback_data="exch_okx")],
+    [InlineKeyboardButton("KuCoin", callback_data="exch_kucoin")],
+    [InlineKeyboardButton("Bybit", callback_data="exch_bybit")],
+    [InlineKeyboardButton("🔙 Cancel", callback_data="menu_setup")]
+])
+HELP_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="main_menu")]])
+CANCEL_TO_SETUP_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Cancel", callback_data="menu_setup")]])
+BACK_TO_SETUP_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Setup", callback_data="menu_setup")]])
+BACK_TO_TRADING_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="menu_trading")]])
+BACK_TO_PORTFOLIO_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="menu_portfolio")]])
+BACK_TO_MONITOR_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="menu_monitor")]])
+
+
+def _load_or_empty(path) -> dict:
+    """Read a JSON file, treating a missing file as empty (runs in a worker thread)."""
+    try:
+        return read_json(path)
+    except FileNotFoundError:
+        return {}
+
+
+def _exch_upper(exchange_name: str) -> str:
+    """Display name of an exchange."""
+    return _EXCH_UPPER.get(exchange_name) or exchange_name.upper()
+
+
+class _UserState:
+    """Where a user is in a multi-step setup flow."""
+    
+    __slots__ = ('flow', 'step', 'exchange')
+    
+    def __init__(self, flow: str, step: str = 'input', exchange: str = None):
+        self.flow = flow
+        self.step = step
+        self.exchange = exchange
+
 
 class ArbitrageBot:
     """Professional Telegram arbitrage bot with interactive UI."""
@@ -21,14 +140,56 @@ class ArbitrageBot:
         self.exchange_manager = exchange_manager
         self.opportunity_detector = opportunity_detector
         self.app = None
-        self.user_states = {}
+        self.user_states = TTLCache(maxsize=USER_STATE_MAX_USERS, ttl=USER_STATE_TTL_SECONDS)
+        
+        # Parsed config, keyed by the file's mtime
+        self._config_cache = None
+        self._config_mtime = 0
+        # Monitor settings shown in the monitor menu, refreshed on config load/save
+        self._scan_interval = 5
+        self._auto_exec = False
+        # Stored API keys; the bot is the only writer, so they are read once
+        self._api_keys_cache = None
+        
+        # (chat_id, message_id) -> hash of the last text/markup we set on it
+        self._last_msg_hash = LRUCache(maxsize=EDITED_MESSAGES_MAX)
+        
+        # Alerts are queued by the engine and sent by a background worker
+        # to the chats that started monitoring (cleared when it is stopped)
+        self.alert_queue: asyncio.Queue = asyncio.Queue(maxsize=ALERT_QUEUE_MAX)
+        self._alert_chat_ids = set()
+        self._alert_task = None
+        
+        # callback_data -> handler, so a button press is a single dict lookup
+        self._callbacks = {
+            "menu_setup": self.show_setup_menu,
+            "menu_trading": self.show_trading_menu,
+            "menu_portfolio": self.show_portfolio_menu,
+            "menu_monitor": self.show_monitor_menu,
+            "help": self.show_help,
+            "main_menu": self.show_main_menu,
+            "setup_exchanges": self.setup_exchanges_flow,
+            "setup_pairs": self.setup_pairs_flow,
+            "setup_config": self.setup_config_flow,
+            "scan_now": self.scan_opportunities,
+            "view_opportunities": self.view_opportunities,
+            "view_balances": self.view_balances,
+            "view_positions": self.view_positions,
+            "check_drift": self.check_drift,
+            "start_monitor": self.start_monitoring,
+            "stop_monitor": self.stop_monitoring,
+            "monitor_status": self.monitor_status,
+        }
     
     async def load_config(self) -> dict:
-        """Load configuration from file."""
+        """Load configuration, re-reading the file only when it has changed."""
         try:
-            async with aiofiles.open(CONFIG_FILE, 'r') as f:
-                content = await f.read()
-                return json.loads(content)
+            mtime = os.stat(CONFIG_FILE).st_mtime_ns
+            if self._config_cache is None or mtime != self._config_mtime:
+                self._config_cache = await asyncio.to_thread(read_json, CONFIG_FILE)
+                self._config_mtime = mtime
+                self._update_monitor_settings(self._config_cache)
+            return copy.deepcopy(self._config_cache)
         except Exception as e:
             logger.error(f"Error loading config: {e}")
             return {}
@@ -36,21 +197,84 @@ class ArbitrageBot:
     async def save_config(self, config: dict):
         """Save configuration to file."""
         try:
-            async with aiofiles.open(CONFIG_FILE, 'w') as f:
-                await f.write(json.dumps(config, indent=2))
+            await asyncio.to_thread(write_json, CONFIG_FILE, config)
+            self._config_mtime = 0
+            self._update_monitor_settings(config)
         except Exception as e:
             logger.error(f"Error saving config: {e}")
+            return
+        
+        # The file is written either way; a bad config only fails the detector's reload
+        try:
+            self.opportunity_detector.reload_config(config)
+        except Exception as e:
+            logger.error(f"Config saved, but the opportunity detector could not reload it "
+                         f"and keeps its previous settings: {e}")
+    
+    def _update_monitor_settings(self, config: dict):
+        """Keep the monitor menu's settings in sync with the config."""
+        trading_config = config.get('trading_config', {})
+        self._scan_interval = trading_config.get('monitoring_interval_seconds', 5)
+        self._auto_exec = trading_config.get('auto_execute', False)
+    
+    async def load_api_keys(self) -> dict:
+        """Load stored (encrypted) API keys, reading the file only on first use."""
+        if self._api_keys_cache is None:
+            self._api_keys_cache = await asyncio.to_thread(_load_or_empty, API_KEYS_FILE)
+        return self._api_keys_cache
+    
+    async def save_api_keys(self):
+        """Write the in-memory (encrypted) API keys to file."""
+        await asyncio.to_thread(write_json, API_KEYS_FILE, self._api_keys_cache)
+    
+    async def _safe_edit(self, query, text: str, reply_markup=None, **kwargs):
+        """Edit the query's message, skipping the API call if text, markup and options are unchanged."""
+        message = query.message
+        key = (message.chat_id, message.message_id) if message else None
+        content_hash = hash((text, reply_markup, tuple(sorted(kwargs.items()))))
+        
+        if key and self._last_msg_hash.get(key) == content_hash:
+            return
+        
+        await query.edit_message_text(text, reply_markup=reply_markup, **kwargs)
+        
+        if key:
+            self._last_msg_hash[key] = content_hash
+    
+    def queue_alert(self, text: str):
+        """Queue an alert for sending without waiting on Telegram; drops the oldest if the queue is full."""
+        if self.alert_queue.full():
+            dropped = self.alert_queue.get_nowait()
+            logger.warning("Alert queue full, dropping: %s", dropped[:80])
+        self.alert_queue.put_nowait(text)
+    
+    async def _alert_worker(self):
+        """Send queued alerts to the registered chats, one at a time."""
+        while True:
+            text = await self.alert_queue.get()
+            try:
+                if not self._alert_chat_ids:
+                    logger.warning("No chat to send alert to, dropping: %s", text[:80])
+                for chat_id in tuple(self._alert_chat_ids):
+                    try:
+                        await self._send_alert_message(chat_id, text)
+                    except Exception as e:
+                        logger.error("Error sending alert to %s: %s", chat_id, e)
+            finally:
+                self.alert_queue.task_done()
+    
+    async def _send_alert_message(self, chat_id: int, text: str):
+        """Send an alert as Markdown, resending it as plain text if Telegram can't parse it."""
+        try:
+            await self.app.bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown')
+        except BadRequest as e:
+            if "parse entities" not in str(e).lower():
+                raise
+            await self.app.bot.send_message(chat_id=chat_id, text=text)
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command with main menu."""
-        keyboard = [
-            [InlineKeyboardButton("🔧 Setup", callback_data="menu_setup")],
-            [InlineKeyboardButton("💰 Trading", callback_data="menu_trading")],
-            [InlineKeyboardButton("📊 Portfolio", callback_data="menu_portfolio")],
-            [InlineKeyboardButton("📈 Monitor", callback_data="menu_monitor")],
-            [InlineKeyboardButton("ℹ️ Help", callback_data="help")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = START_MENU_MARKUP
         
         welcome_text = (
             "🤖 *Arbitrage Trading Bot*\n\n"
@@ -67,138 +291,58 @@ class ArbitrageBot:
         
         data = query.data
         
-        if data == "menu_setup":
-            await self.show_setup_menu(query)
-        elif data == "menu_trading":
-            await self.show_trading_menu(query)
-        elif data == "menu_portfolio":
-            await self.show_portfolio_menu(query)
-        elif data == "menu_monitor":
-            await self.show_monitor_menu(query)
-        elif data == "help":
-            await self.show_help(query)
-        elif data == "main_menu":
-            await self.show_main_menu(query)
-        elif data == "setup_exchanges":
-            await self.setup_exchanges_flow(query)
-        elif data == "setup_pairs":
-            await self.setup_pairs_flow(query)
-        elif data == "setup_config":
-            await self.setup_config_flow(query)
+        handler = self._callbacks.get(data)
+        if handler:
+            await handler(query)
         elif data.startswith("exch_"):
-            exchange_name = data.replace("exch_", "")
-            await self.handle_exchange_selection(query, exchange_name)
-        elif data == "scan_now":
-            await self.scan_opportunities(query)
-        elif data == "view_opportunities":
-            await self.view_opportunities(query)
-        elif data == "view_balances":
-            await self.view_balances(query)
-        elif data == "view_positions":
-            await self.view_positions(query)
-        elif data == "check_drift":
-            await self.check_drift(query)
-        elif data == "start_monitor":
-            await self.start_monitoring(query)
-        elif data == "stop_monitor":
-            await self.stop_monitoring(query)
-        elif data == "monitor_status":
-            await self.monitor_status(query)
+            await self.handle_exchange_selection(query, data[5:])
     
     async def show_main_menu(self, query):
         """Show main menu."""
-        keyboard = [
-            [InlineKeyboardButton("🔧 Setup", callback_data="menu_setup")],
-            [InlineKeyboardButton("💰 Trading", callback_data="menu_trading")],
-            [InlineKeyboardButton("📊 Portfolio", callback_data="menu_portfolio")],
-            [InlineKeyboardButton("📈 Monitor", callback_data="menu_monitor")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = MAIN_MENU_MARKUP
         text = "🤖 *Main Menu*\n\nChoose an option:"
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def show_setup_menu(self, query):
         """Show setup menu."""
-        keyboard = [
-            [InlineKeyboardButton("➕ Add Exchange", callback_data="setup_exchanges")],
-            [InlineKeyboardButton("📝 Configure Pairs", callback_data="setup_pairs")],
-            [InlineKeyboardButton("⚙️ Settings", callback_data="setup_config")],
-            [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = SETUP_MENU_MARKUP
         
         config = await self.load_config()
         num_pairs = len(config.get('trading_pairs', []))
         num_exchanges = len(self.exchange_manager.exchanges)
         
-        text = (
-            "🔧 *Setup & Configuration*\n\n"
-            f"Connected Exchanges: {num_exchanges}\n"
-            f"Trading Pairs: {num_pairs}\n\n"
-            "What would you like to configure?"
-        )
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        text = _SETUP_TMPL % (num_exchanges, num_pairs)
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def show_trading_menu(self, query):
         """Show trading menu."""
-        keyboard = [
-            [InlineKeyboardButton("🔍 Scan Now", callback_data="scan_now")],
-            [InlineKeyboardButton("📋 View Opportunities", callback_data="view_opportunities")],
-            [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = TRADING_MENU_MARKUP
         text = "💰 *Trading*\n\nFind and execute arbitrage opportunities:"
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def show_portfolio_menu(self, query):
         """Show portfolio menu."""
-        keyboard = [
-            [InlineKeyboardButton("💵 View Balances", callback_data="view_balances")],
-            [InlineKeyboardButton("📦 Positions", callback_data="view_positions")],
-            [InlineKeyboardButton("📊 Check Drift", callback_data="check_drift")],
-            [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = PORTFOLIO_MENU_MARKUP
         text = "📊 *Portfolio Management*\n\nView your holdings and drift:"
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def show_monitor_menu(self, query):
         """Show monitoring menu."""
         is_monitoring = self.opportunity_detector.is_monitoring()
         
         if is_monitoring:
-            keyboard = [
-                [InlineKeyboardButton("⏸ Stop Monitoring", callback_data="stop_monitor")],
-                [InlineKeyboardButton("📊 Status", callback_data="monitor_status")],
-                [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-            ]
+            reply_markup = MONITOR_ACTIVE_MARKUP
             status_text = "🟢 *Status: ACTIVE*"
         else:
-            keyboard = [
-                [InlineKeyboardButton("▶️ Start Monitoring", callback_data="start_monitor")],
-                [InlineKeyboardButton("🔙 Back", callback_data="main_menu")]
-            ]
+            reply_markup = MONITOR_STOPPED_MARKUP
             status_text = "🔴 *Status: STOPPED*"
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        config = await self.load_config()
-        interval = config.get('trading_config', {}).get('monitoring_interval_seconds', 5)
-        auto_exec = config.get('trading_config', {}).get('auto_execute', False)
-        
-        text = (
-            f"📈 *Continuous Monitoring*\n\n"
-            f"{status_text}\n\n"
-            f"Scan Interval: {interval}s\n"
-            f"Auto-Execute: {'Yes' if auto_exec else 'No'}\n\n"
-            "Start monitoring to automatically scan for opportunities."
-        )
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        text = _MONITOR_TMPL % (status_text, self._scan_interval, 'Yes' if self._auto_exec else 'No')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def show_help(self, query):
         """Show help information."""
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="main_menu")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = HELP_MARKUP
         
         text = (
             "ℹ️ *Help & Information*\n\n"
@@ -217,40 +361,28 @@ class ArbitrageBot:
             "• Profitability validation\n"
             "• Configurable risk limits"
         )
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def setup_exchanges_flow(self, query):
         """Start exchange setup flow."""
         user_id = query.from_user.id
-        self.user_states[user_id] = {'flow': 'add_exchange', 'step': 'select_exchange'}
+        self.user_states[user_id] = _UserState('add_exchange', 'select_exchange')
         
-        keyboard = [
-            [InlineKeyboardButton("Binance", callback_data="exch_binance")],
-            [InlineKeyboardButton("OKX", callback_data="exch_okx")],
-            [InlineKeyboardButton("KuCoin", callback_data="exch_kucoin")],
-            [InlineKeyboardButton("Bybit", callback_data="exch_bybit")],
-            [InlineKeyboardButton("🔙 Cancel", callback_data="menu_setup")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = EXCHANGE_SELECT_MARKUP
         
         text = "➕ *Add Exchange*\n\nSelect the exchange you want to add:"
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def handle_exchange_selection(self, query, exchange_name: str):
         """Handle exchange selection and guide through API key setup."""
         user_id = query.from_user.id
         
-        self.user_states[user_id] = {
-            'flow': 'add_exchange',
-            'step': 'api_key',
-            'exchange': exchange_name
-        }
+        self.user_states[user_id] = _UserState('add_exchange', 'api_key', exchange_name)
         
-        keyboard = [[InlineKeyboardButton("🔙 Cancel", callback_data="menu_setup")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = CANCEL_TO_SETUP_MARKUP
         
         text = (
-            f"🔑 *Add {exchange_name.upper()} API Keys*\n\n"
+            f"🔑 *Add {_exch_upper(exchange_name)} API Keys*\n\n"
             f"Please send your API credentials in this format:\n\n"
             f"```\n"
             f"API Key: your_api_key_here\n"
@@ -268,15 +400,14 @@ class ArbitrageBot:
             f"• Never share these keys"
         )
         
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def setup_pairs_flow(self, query):
         """Start pairs setup flow."""
         user_id = query.from_user.id
-        self.user_states[user_id] = {'flow': 'add_pairs', 'step': 'input'}
+        self.user_states[user_id] = _UserState('add_pairs')
         
-        keyboard = [[InlineKeyboardButton("🔙 Cancel", callback_data="menu_setup")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = CANCEL_TO_SETUP_MARKUP
         
         text = (
             "📝 *Configure Trading Pairs*\n\n"
@@ -286,7 +417,7 @@ class ArbitrageBot:
             "*Example:*\n"
             "`BTC/USDT, ETH/USDT`"
         )
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def setup_config_flow(self, query):
         """Start config setup flow."""
@@ -294,10 +425,9 @@ class ArbitrageBot:
         current_amount = config.get('trading_config', {}).get('trade_amount_usdt', 100)
         
         user_id = query.from_user.id
-        self.user_states[user_id] = {'flow': 'set_config', 'step': 'input'}
+        self.user_states[user_id] = _UserState('set_config')
         
-        keyboard = [[InlineKeyboardButton("🔙 Cancel", callback_data="menu_setup")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = CANCEL_TO_SETUP_MARKUP
         
         text = (
             f"⚙️ *Trade Settings*\n\n"
@@ -305,38 +435,46 @@ class ArbitrageBot:
             "Send me the new trade amount in USD.\n\n"
             "*Example:* `100` for $100 per trade"
         )
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def scan_opportunities(self, query):
         """Scan for opportunities."""
-        await query.edit_message_text("🔍 *Scanning for opportunities...*\n\nPlease wait...", parse_mode='Markdown')
+        # Nothing to scan - skip the network round-trips entirely
+        config = await self.load_config()
+        if not self.exchange_manager.exchanges or not config.get('trading_pairs'):
+            reply_markup = BACK_TO_TRADING_MARKUP
+            text = "⚠️ *Nothing to scan*\n\nConfigure exchanges and pairs first (Setup menu)."
+            await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
+            return
+        
+        await self._safe_edit(query, "🔍 *Scanning for opportunities...*\n\nPlease wait...", parse_mode='Markdown')
         
         opportunities = await self.opportunity_detector.scan_for_opportunities()
         
         if not opportunities:
-            keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_trading")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = BACK_TO_TRADING_MARKUP
             text = "🔍 *Scan Complete*\n\nNo profitable opportunities found at this time."
-            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+            await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
             return
         
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_trading")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_TRADING_MARKUP
         
-        text = f"💰 *Found {len(opportunities)} Opportunities!*\n\n"
+        parts = [f"💰 *Found {len(opportunities)} Opportunities!*\n\n"]
         for i, opp in enumerate(opportunities[:5], 1):
-            text += (
-                f"*{i}. {opp['pair']}*\n"
-                f"   Buy: {opp['buy_exchange']} @ ${opp['buy_price']:.6f}\n"
-                f"   Sell: {opp['sell_exchange']} @ ${opp['sell_price']:.6f}\n"
-                f"   💵 Profit: `${opp['net_profit']:.2f}` ({opp['roi']:.2f}%)\n"
-                f"   💸 Fees: ${opp['total_fees']:.2f}\n\n"
+            parts.append(
+                f"*{i}. {opp.pair}*\n"
+                f"   Buy: {opp.buy_exchange} @ ${opp.buy_price:.6f}\n"
+                f"   Sell: {opp.sell_exchange} @ ${opp.sell_price:.6f}\n"
+                f"   💵 Profit: `${opp.net_profit:.2f}` ({opp.roi:.2f}%)\n"
+                f"   💸 Fees: ${opp.total_fees:.2f}\n\n"
             )
         
         if len(opportunities) > 5:
-            text += f"_...and {len(opportunities) - 5} more_"
+            parts.append(f"_...and {len(opportunities) - 5} more_")
+        
+        text = "".join(parts)
         
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def view_opportunities(self, query):
         """View current opportunities."""
@@ -345,17 +483,24 @@ class ArbitrageBot:
     async def view_balances(self, query):
         """View exchange balances."""
         if not self.exchange_manager.exchanges:
-            keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_portfolio")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = BACK_TO_PORTFOLIO_MARKUP
             text = "⚠️ No exchanges connected yet.\n\nPlease add exchanges first."
-            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+            await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
             return
         
         text = "💵 *Exchange Balances*\n\n"
         
-        for exchange_name in self.exchange_manager.exchanges.keys():
+        # Fetch all exchanges concurrently
+        exchange_names = list(self.exchange_manager.exchanges.keys())
+        balances = await asyncio.gather(
+            *(self.exchange_manager.fetch_balance(name) for name in exchange_names),
+            return_exceptions=True
+        )
+        
+        for exchange_name, balance in zip(exchange_names, balances):
             try:
-                balance = await self.exchange_manager.fetch_balance(exchange_name)
+                if isinstance(balance, Exception):
+                    raise balance
                 
                 # Get all tokens with non-zero balance
                 tokens_with_balance = []
@@ -384,7 +529,7 @@ class ArbitrageBot:
                             'free': free_amt
                         })
                 
-                text += f"*{exchange_name.upper()}*\n"
+                text += f"*{_exch_upper(exchange_name)}*\n"
                 
                 if tokens_with_balance:
                     # Sort by total balance descending
@@ -399,28 +544,27 @@ class ArbitrageBot:
                 
             except Exception as e:
                 logger.error(f"Error fetching balance for {exchange_name}: {e}")
-                text += f"*{exchange_name.upper()}*\n  ❌ Error: {str(e)}\n\n"
+                text += f"*{_exch_upper(exchange_name)}*\n  ❌ Error: {str(e)}\n\n"
         
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_portfolio")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        reply_markup = BACK_TO_PORTFOLIO_MARKUP
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def view_positions(self, query):
         """View positions (placeholder)."""
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_portfolio")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_PORTFOLIO_MARKUP
         text = "📦 *Positions*\n\n_Feature coming soon..._"
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def check_drift(self, query):
         """Check drift (placeholder)."""
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_portfolio")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_PORTFOLIO_MARKUP
         text = "📊 *Drift Analysis*\n\n_Feature coming soon..._"
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def start_monitoring(self, query):
-        """Start monitoring."""
+        """Start monitoring; this chat receives the monitoring alerts."""
+        if query.message:
+            self._alert_chat_ids.add(query.message.chat_id)
         success = await self.opportunity_detector.start_monitoring()
         
         if success:
@@ -428,22 +572,21 @@ class ArbitrageBot:
         else:
             text = "⚠️ Monitoring is already active."
         
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_monitor")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        reply_markup = BACK_TO_MONITOR_MARKUP
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def stop_monitoring(self, query):
-        """Stop monitoring."""
+        """Stop monitoring and forget the alert recipients."""
         success = await self.opportunity_detector.stop_monitoring()
+        self._alert_chat_ids.clear()
         
         if success:
             text = "⏸ *Monitoring Stopped*"
         else:
             text = "⚠️ Monitoring was not active."
         
-        keyboard = [[InlineKeyboardButton("🔙 Back", callback_data="menu_monitor")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        reply_markup = BACK_TO_MONITOR_MARKUP
+        await self._safe_edit(query, text, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def monitor_status(self, query):
         """Show monitor status."""
@@ -458,7 +601,7 @@ class ArbitrageBot:
             await update.message.reply_text("ℹ️ Use /start to see the main menu.", parse_mode='Markdown')
             return
         
-        flow = state.get('flow')
+        flow = state.flow
         
         if flow == 'add_exchange':
             await self.process_api_keys(update, state)
@@ -467,27 +610,24 @@ class ArbitrageBot:
         elif flow == 'set_config':
             await self.process_config_input(update)
     
-    async def process_api_keys(self, update: Update, state: dict):
+    async def process_api_keys(self, update: Update, state: '_UserState'):
         """Process API key input."""
         try:
             text = update.message.text.strip()
-            exchange_name = state.get('exchange')
+            exchange_name = state.exchange
             
-            lines = text.split('\n')
             credentials = {}
             
-            for line in lines:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower()
-                    value = value.strip()
-                    
-                    if 'api' in key or 'key' in key:
-                        credentials['api_key'] = value
-                    elif 'secret' in key:
-                        credentials['secret'] = value
-                    elif 'pass' in key:
-                        credentials['passphrase'] = value
+            for match in _CRED_RE.finditer(text):
+                key = match['key'].lower()
+                value = match['value']
+                
+                if 'api' in key or 'key' in key:
+                    credentials['api_key'] = value
+                elif 'secret' in key:
+                    credentials['secret'] = value
+                elif 'pass' in key:
+                    credentials['passphrase'] = value
             
             if 'api_key' not in credentials or 'secret' not in credentials:
                 await update.message.reply_text(
@@ -499,24 +639,19 @@ class ArbitrageBot:
                 )
                 return
             
-            from utils.security import encrypt_api_key
+            # Encryption is CPU-bound - keep it off the event loop
+            encrypted = await asyncio.to_thread(encrypt_api_keys, credentials)
             
-            api_keys = {}
-            if API_KEYS_FILE.exists():
-                async with aiofiles.open(API_KEYS_FILE, 'r') as f:
-                    content = await f.read()
-                    api_keys = json.loads(content)
-            api_keys['exchanges'] = api_keys.get('exchanges', {})
-            api_keys['exchanges'][exchange_name] = {
-                'api_key': encrypt_api_key(credentials['api_key']),
-                'secret': encrypt_api_key(credentials['secret']),
-                'passphrase': encrypt_api_key(credentials.get('passphrase', '')) if 'passphrase' in credentials else None
+            api_keys = await self.load_api_keys()
+            api_keys.setdefault('exchanges', {})[exchange_name] = {
+                'api_key': encrypted['api_key'],
+                'secret': encrypted['secret'],
+                'passphrase': encrypted.get('passphrase')
             }
             
-            async with aiofiles.open(API_KEYS_FILE, 'w') as f:
-                await f.write(json.dumps(api_keys, indent=2))
+            await self.save_api_keys()
             
-            await update.message.reply_text(f"⏳ Connecting to {exchange_name.upper()}...", parse_mode='Markdown')
+            await update.message.reply_text(f"⏳ Connecting to {_exch_upper(exchange_name)}...", parse_mode='Markdown')
             
             # Pass the ENCRYPTED credentials (not plain text!)
             success, error_msg = await self.exchange_manager.add_exchange(
@@ -528,11 +663,10 @@ class ArbitrageBot:
             
             self.user_states.pop(update.effective_user.id, None)
             
-            keyboard = [[InlineKeyboardButton("🔙 Back to Setup", callback_data="menu_setup")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = BACK_TO_SETUP_MARKUP
             
             if success:
-                text = f"✅ *{exchange_name.upper()} Connected!*\n\nYour exchange is now ready to use."
+                text = EXCHANGE_CONNECTED_TEXTS.get(exchange_name) or _CONNECTED_TMPL % _exch_upper(exchange_name)
                 await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
             else:
                 text = (
@@ -553,14 +687,14 @@ class ArbitrageBot:
     async def process_pairs_input(self, update: Update):
         """Process pairs input."""
         text = update.message.text.strip()
-        raw_pairs = re.split(r'[,\n]+', text)
+        raw_pairs = _SPLIT_RE.split(text)
         pairs = [p.strip().upper() for p in raw_pairs if p.strip()]
         
         config = await self.load_config()
         
         valid_pairs = []
         for pair in pairs:
-            if re.match(r'^[A-Z0-9]+/USDT$', pair):
+            if _PAIR_RE.match(pair):
                 pair_config = {
                     'pair': pair,
                     'enabled': True,
@@ -573,12 +707,11 @@ class ArbitrageBot:
         
         self.user_states.pop(update.effective_user.id, None)
         
-        keyboard = [[InlineKeyboardButton("🔙 Back to Setup", callback_data="menu_setup")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = BACK_TO_SETUP_MARKUP
         
-        text = f"✅ *Configured {len(valid_pairs)} trading pairs:*\n\n"
-        for p in valid_pairs:
-            text += f"• {p['pair']}\n"
+        parts = [f"✅ *Configured {len(valid_pairs)} trading pairs:*\n\n"]
+        parts.extend(f"• {p['pair']}\n" for p in valid_pairs)
+        text = "".join(parts)
         
         await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     
@@ -595,14 +728,34 @@ class ArbitrageBot:
             
             self.user_states.pop(update.effective_user.id, None)
             
-            keyboard = [[InlineKeyboardButton("🔙 Back to Setup", callback_data="menu_setup")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = BACK_TO_SETUP_MARKUP
             
             text = f"✅ *Trade amount set to:* `${amount:.2f}`"
             await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
         except:
             await update.message.reply_text("❌ Invalid amount. Please send a positive number.", parse_mode='Markdown')
     
+    async def _post_init(self, application: Application):
+        """Load the config and start the alert worker once the application is up."""
+        await self.load_config()
+        self._alert_task = asyncio.create_task(self._alert_worker())
+        self.opportunity_detector.set_alert_callback(self.queue_alert)
+    
+    async def _post_stop(self, application: Application):
+        """Send the alerts still queued (bounded by ALERT_DRAIN_TIMEOUT_SECONDS), then stop the worker."""
+        if self._alert_task is None:
+            return
+        try:
+            await asyncio.wait_for(self.alert_queue.join(), ALERT_DRAIN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d unsent alerts at shutdown", self.alert_queue.qsize())
+        self._alert_task.cancel()
+        try:
+            await self._alert_task
+        except asyncio.CancelledError:
+            pass
+        self._alert_task = None
+    
     def setup_handlers(self):
         """Set up handlers."""
         self.app.add_handler(CommandHandler("start", self.start_command))
@@ -611,13 +764,28 @@ class ArbitrageBot:
     
     def run(self):
         """Start the bot - Windows compatible."""
+        # Use uvloop when available (optional dependency, not supported on Windows)
+        if sys.platform != 'win32':
+            try:
+                import uvloop
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+                logger.info("Using uvloop event loop")
+            except ImportError:
+                pass
+        
         try:
             loop = asyncio.get_event_loop()
         except RuntimeError:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
         
-        self.app = Application.builder().token(self.token).build()
+        self.app = (
+            Application.builder()
+            .token(self.token)
+            .post_init(self._post_init)
+            .post_stop(self._post_stop)
+            .build()
+        )
         self.setup_handlers()
         
         logger.info("Bot starting...")
@@ -1,8 +1,10 @@
 """
 Configuration constants and defaults for the arbitrage bot.
 """
+import copy
 import os
 from pathlib import Path
+from types import MappingProxyType
 
 # Project paths
 BASE_DIR = Path(__file__).parent
@@ -11,18 +13,19 @@ DATA_DIR = BASE_DIR / "data"
 # Data files
 API_KEYS_FILE = DATA_DIR / "api_keys.json"
 POSITIONS_FILE = DATA_DIR / "positions.json"
-TRADES_FILE = DATA_DIR / "trades.json"
+TRADES_FILE = DATA_DIR / "trades.jsonl"  # one JSON trade record per line
 FEES_CACHE_FILE = DATA_DIR / "fees_cache.json"
 CONFIG_FILE = DATA_DIR / "config.json"
 
 # Default configuration
-DEFAULT_CONFIG = {
+_DEFAULT_CONFIG_RAW = {
     "trading_config": {
         "trade_amount_usdt": 100.0,
         "enabled": False,
         "auto_execute": False,
         "require_manual_approval": True,
-        "monitoring_interval_seconds": 5
+        "monitoring_interval_seconds": 5,
+        "ticker_cache_ttl_seconds": 1.0
     },
     "trading_pairs": [],
     "risk_limits": {
@@ -35,11 +38,30 @@ DEFAULT_CONFIG = {
         "slippage_buffer_percent": 0.2,
         "max_fee_impact_percent": 50.0,
         "max_concurrent_trades": 3,
-        "max_opportunity_age_seconds": 10
+        "max_opportunity_age_seconds": 10,
+        "max_validation_errors": 0
     }
 }
 
 
+def _freeze(value):
+    """Recursively convert dicts/lists to read-only mappings/tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+# Read-only template - use default_config() when a mutable copy is needed
+DEFAULT_CONFIG = _freeze(_DEFAULT_CONFIG_RAW)
+
+
+def default_config() -> dict:
+    """Return a fresh, mutable copy of the default configuration."""
+    return copy.deepcopy(_DEFAULT_CONFIG_RAW)
+
+
 # Supported exchanges
 SUPPORTED_EXCHANGES = ["binance", "okx", "kucoin", "bybit", "gate", "mexc"]
 
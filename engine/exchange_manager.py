@@ -1,19 +1,59 @@
 """
 CCXT Exchange Manager - handles exchange connections and operations.
 """
+import ssl
+import aiohttp
+import certifi
 import ccxt.async_support as ccxt
 import logging
-from typing import Dict, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
+from utils.async_pool import run_coros_pool
 from utils.security import decrypt_api_key
 
 logger = logging.getLogger(__name__)
 
+# Shared HTTP connection pool for all exchanges
+HTTP_POOL_LIMIT = 256
+DNS_CACHE_TTL_SECONDS = 300
+
+# Most single-ticker requests in flight per exchange when it has no fetchTickers
+TICKER_FETCH_CONCURRENCY = 8
+
+# Connection error -> user-facing message, first match wins.
+# (case-sensitive fragments, lowercase fragments, template)
+_CONNECT_ERROR_TABLE = (
+    (("Invalid API",), ("invalid signature",), "Invalid API Key or Secret - {msg}"),
+    (("IP",), ("not in whitelist",), "IP not whitelisted - {msg}"),
+    ((), ("permission", "not authorized"), "Insufficient permissions - {msg}"),
+    ((), ("passphrase",), "Invalid passphrase - {msg}"),
+    (("400", "401", "403"), (), "Authentication failed ({type}) - Check your API credentials"),
+)
+
 
 class ExchangeManager:
     """Manages multiple exchange connections."""
     
     def __init__(self):
         self.exchanges: Dict[str, ccxt.Exchange] = {}
+        self._close_hooks: List[Callable[[], Awaitable]] = []
+        # Created on first connect, inside the event loop that will use it
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def register_close_hook(self, hook: Callable[[], Awaitable]):
+        """Register a coroutine function to run in close_all() (e.g. flushing caches)."""
+        self._close_hooks.append(hook)
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session shared by all exchanges, creating it if needed."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                ttl_dns_cache=DNS_CACHE_TTL_SECONDS,
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
     
     async def add_exchange(
         self,
@@ -48,6 +88,7 @@ class ExchangeManager:
                 'apiKey': api_key,
                 'secret': secret,
                 'enableRateLimit': True,
+                'session': self._get_session(),
             }
             
             if passphrase:
@@ -73,18 +114,12 @@ class ExchangeManager:
             # Provide user-friendly error messages
             if not error_msg:
                 return False, f"Connection failed: {error_type} (check server logs for details)"
-            elif "Invalid API" in error_msg or "invalid signature" in error_msg.lower():
-                return False, f"Invalid API Key or Secret - {error_msg}"
-            elif "IP" in error_msg or "not in whitelist" in error_msg.lower():
-                return False, f"IP not whitelisted - {error_msg}"
-            elif "permission" in error_msg.lower() or "not authorized" in error_msg.lower():
-                return False, f"Insufficient permissions - {error_msg}"
-            elif "Invalid passphrase" in error_msg or "passphrase" in error_msg.lower():
-                return False, f"Invalid passphrase - {error_msg}"
-            elif "400" in error_msg or "401" in error_msg or "403" in error_msg:
-                return False, f"Authentication failed ({error_type}) - Check your API credentials"
-            else:
-                return False, f"{error_type}: {error_msg}"
+            
+            error_lower = error_msg.lower()
+            for fragments, lower_fragments, template in _CONNECT_ERROR_TABLE:
+                if any(f in error_msg for f in fragments) or any(f in error_lower for f in lower_fragments):
+                    return False, template.format(msg=error_msg, type=error_type)
+            return False, f"{error_type}: {error_msg}"
     
     def get_exchange(self, exchange_name: str) -> Optional[ccxt.Exchange]:
         """Get exchange instance by name."""
@@ -117,11 +152,57 @@ class ExchangeManager:
             raise ValueError(f"Exchange {exchange_name} not initialized")
         return await exchange.fetch_ticker(symbol)
     
+    @staticmethod
+    async def _fetch_ticker_or_error(exchange, symbol: str):
+        """Fetch one ticker, returning (symbol, ticker or the exception raised)."""
+        try:
+            return symbol, await exchange.fetch_ticker(symbol)
+        except Exception as e:
+            return symbol, e
+    
+    async def fetch_tickers(self, exchange_name: str, symbols: List[str]) -> Dict[str, dict]:
+        """
+        Fetch tickers for several symbols.
+        
+        Uses a single fetch_tickers request when the exchange supports it,
+        otherwise fetches each symbol, at most TICKER_FETCH_CONCURRENCY at a time.
+        
+        Returns:
+            dict: {symbol: ticker} (symbols that failed are omitted)
+        """
+        exchange = self.get_exchange(exchange_name)
+        if not exchange:
+            raise ValueError(f"Exchange {exchange_name} not initialized")
+        
+        if exchange.has.get('fetchTickers'):
+            return await exchange.fetch_tickers(symbols)
+        
+        tickers = {}
+        async for symbol, ticker in run_coros_pool(
+            (self._fetch_ticker_or_error(exchange, symbol) for symbol in symbols),
+            TICKER_FETCH_CONCURRENCY
+        ):
+            if isinstance(ticker, Exception):
+                logger.error(f"Ticker fetch error for {symbol} on {exchange_name}: {ticker}")
+                continue
+            tickers[symbol] = ticker
+        return tickers
+    
     async def close_all(self):
-        """Close all exchange connections."""
+        """Run close hooks, then close all exchange connections and the shared session."""
+        for hook in self._close_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.error(f"Error in close hook: {e}")
+        
         for name, exchange in self.exchanges.items():
             try:
                 await exchange.close()
                 logger.info(f"Closed connection to {name}")
             except Exception as e:
                 logger.error(f"Error closing {name}: {e}")
+        
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -1,43 +1,143 @@
 """
 Fee manager for fetching and caching trading fees.
 """
+import asyncio
 import logging
-import json
-import aiofiles
+import time
 from pathlib import Path
-from datetime import datetime, timedelta
+from typing import Optional
+from datetime import datetime
+from cachetools import TLRUCache
 from config import FEES_CACHE_FILE
+from utils.json_io import dump_json, read_json, write_bytes_atomic
+from utils.profit_calculator import invalidate_fee_rate_cache
 
 logger = logging.getLogger(__name__)
 
+# Delay between a cache change and writing it to disk
+FEE_CACHE_FLUSH_SECONDS = 30
+
+# Most (exchange, symbol) fee entries kept; least recently used go first
+FEE_CACHE_MAX_ENTRIES = 1024
+
+# After a failed fetch_trading_fees, wait this long before asking the exchange again
+ACCOUNT_FEES_RETRY_SECONDS = 60
+
 
 class FeeManager:
     """Manages trading fee fetching and caching."""
     
     def __init__(self, exchange_manager):
         self.exchange_manager = exchange_manager
-        self.cache = {}
-        self.cache_duration = timedelta(hours=24)
+        self.cache_duration = 24 * 60 * 60  # seconds
+        # Entries expire cache_duration after their fetch timestamp
+        self.cache = TLRUCache(
+            maxsize=FEE_CACHE_MAX_ENTRIES,
+            ttu=lambda _key, entry, _now: entry['timestamp'] + self.cache_duration,
+            timer=time.time
+        )
+        self._dirty = False
+        self._flush_task = None
+        # exchange -> (expiry time, fetch_trading_fees() result or None if it failed);
+        # tasks dedupe concurrent fetches
+        self._account_fees = {}
+        self._account_fee_tasks = {}
+        exchange_manager.register_close_hook(self.flush)
     
     async def load_cache(self):
         """Load fee cache from file."""
         if FEES_CACHE_FILE.exists():
             try:
-                async with aiofiles.open(FEES_CACHE_FILE, 'r') as f:
-                    content = await f.read()
-                    self.cache = json.loads(content)
+                entries = await asyncio.to_thread(read_json, FEES_CACHE_FILE)
+                self._migrate_timestamps(entries)
+                self.cache.clear()
+                self.cache.update(entries)  # already expired entries are skipped
                 logger.info("Fee cache loaded")
             except Exception as e:
                 logger.error(f"Error loading fee cache: {e}")
     
+    @staticmethod
+    def _migrate_timestamps(entries: dict):
+        """Convert ISO timestamps from older cache files to epoch seconds."""
+        for key, entry in list(entries.items()):
+            timestamp = entry.get('timestamp')
+            if isinstance(timestamp, str):
+                try:
+                    entry['timestamp'] = datetime.fromisoformat(timestamp).timestamp()
+                except ValueError:
+                    del entries[key]
+    
     async def save_cache(self):
         """Save fee cache to file."""
         try:
-            async with aiofiles.open(FEES_CACHE_FILE, 'w') as f:
-                await f.write(json.dumps(self.cache, indent=2))
+            content = dump_json(dict(self.cache))
+            await asyncio.to_thread(write_bytes_atomic, FEES_CACHE_FILE, content)
         except Exception as e:
             logger.error(f"Error saving fee cache: {e}")
     
+    async def flush(self):
+        """Save the cache if it has unsaved changes."""
+        if self._dirty:
+            self._dirty = False
+            await self.save_cache()
+    
+    def _schedule_flush(self):
+        """Mark the cache dirty and make sure a delayed save is pending."""
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+    
+    async def _delayed_flush(self):
+        """Save the cache after FEE_CACHE_FLUSH_SECONDS, batching changes made meanwhile."""
+        await asyncio.sleep(FEE_CACHE_FLUSH_SECONDS)
+        await self.flush()
+    
+    def refresh(self):
+        """Forget all cached fees so they are fetched again on next use."""
+        self.cache.clear()
+        self._account_fees.clear()
+        self._schedule_flush()
+        invalidate_fee_rate_cache()  # profit_calculator keeps its own copy of the rates
+        logger.info("Fee cache cleared")
+    
+    async def _fetch_account_fees(self, exchange_name: str, exchange) -> Optional[dict]:
+        """
+        Fetch the account's fee schedule.
+        
+        A failure yields None, so callers fall back to market fees, and is retried
+        after ACCOUNT_FEES_RETRY_SECONDS rather than remembered for cache_duration.
+        """
+        try:
+            fees_all = await exchange.fetch_trading_fees()
+            expires_at = time.time() + self.cache_duration
+            previous = self._account_fees.get(exchange_name)
+            if previous and previous[1] is None:
+                # profit_calculator may still hold rates from the market-fee fallback
+                invalidate_fee_rate_cache()
+        except Exception as e:
+            logger.warning(f"fetch_trading_fees failed on {exchange_name}, using market fees: {e}")
+            fees_all = None
+            expires_at = time.time() + ACCOUNT_FEES_RETRY_SECONDS
+        self._account_fees[exchange_name] = (expires_at, fees_all)
+        return fees_all
+    
+    async def _get_account_fees(self, exchange_name: str, exchange) -> Optional[dict]:
+        """
+        Get the account's fee schedule for all symbols on an exchange (None if unavailable).
+        
+        One fetch_trading_fees request serves every symbol for cache_duration;
+        concurrent callers share the same request.
+        """
+        cached = self._account_fees.get(exchange_name)
+        if cached and time.time() < cached[0]:
+            return cached[1]
+        
+        task = self._account_fee_tasks.get(exchange_name)
+        if task is None or task.done():
+            task = asyncio.create_task(self._fetch_account_fees(exchange_name, exchange))
+            self._account_fee_tasks[exchange_name] = task
+        return await asyncio.shield(task)
+    
     async def get_trading_fees(self, exchange_name: str, symbol: str) -> dict:
         """
         Get trading fees for a symbol on an exchange.
@@ -47,12 +147,10 @@ class FeeManager:
         """
         cache_key = f"{exchange_name}:{symbol}"
         
-        # Check cache
-        if cache_key in self.cache:
-            cached = self.cache[cache_key]
-            cache_time = datetime.fromisoformat(cached['timestamp'])
-            if datetime.now() - cache_time < self.cache_duration:
-                return cached['fees']
+        # Check cache (expired entries are evicted by the cache itself)
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached['fees']
         
         # Fetch from exchange
         try:
@@ -60,28 +158,41 @@ class FeeManager:
             if not exchange:
                 raise ValueError(f"Exchange {exchange_name} not initialized")
             
-            # Load markets if not loaded
-            if not exchange.markets:
-                await exchange.load_markets()
-             
-            # Get fee structure
-            if symbol in exchange.markets:
-                market = exchange.markets[symbol]
+            # Prefer the account's actual fee tier; market data only has the default tier
+            account_fee = {}
+            fallback = False  # True if these fees are only a stand-in for the real ones
+            if exchange.has.get('fetchTradingFees'):
+                account_fees = await self._get_account_fees(exchange_name, exchange)
+                if account_fees is None:
+                    fallback = True
+                else:
+                    account_fee = account_fees.get(symbol) or {}
+            
+            # Get fee structure (markets were loaded when the exchange was added)
+            markets = exchange.markets or {}
+            if account_fee.get('maker') is not None and account_fee.get('taker') is not None:
+                maker_fee = account_fee['maker'] * 100  # Convert to percentage
+                taker_fee = account_fee['taker'] * 100
+                fallback = False
+            elif symbol in markets:
+                market = markets[symbol]
                 maker_fee = market.get('maker', 0.001) * 100  # Convert to percentage
                 taker_fee = market.get('taker', 0.001) * 100
             else:
                 # Default fees if market not found
                 maker_fee = 0.1
                 taker_fee = 0.1
+                fallback = True
             
             fees = {'maker': maker_fee, 'taker': taker_fee}
             
-            # Cache result
-            self.cache[cache_key] = {
-                'fees': fees,
-                'timestamp': datetime.now().isoformat()
-            }
-            await self.save_cache()
+            # Cache result - stand-in fees are recomputed on the next call instead
+            if not fallback:
+                self.cache[cache_key] = {
+                    'fees': fees,
+                    'timestamp': time.time()
+                }
+                self._schedule_flush()
             
             return fees
             
@@ -0,0 +1,42 @@
+"""
+Data records passed between the engine components.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class Opportunity:
+    """An arbitrage opportunity found by a scan (prices in quote currency, fees in USD)."""
+    pair: str
+    base: str
+    quote: str
+    buy_exchange: str
+    sell_exchange: str
+    buy_price: float
+    sell_price: float
+    quantity: float
+    trade_amount: float
+    gross_spread: float
+    gross_profit: float
+    buy_fee: float
+    sell_fee: float
+    total_fees: float
+    net_profit: float
+    roi: float
+    timestamp: float  # time.monotonic() at detection - only meaningful within this process
+
+
+@dataclass(slots=True, frozen=True)
+class RiskLimits:
+    """Risk limits from the config's 'risk_limits' section; unknown keys raise TypeError."""
+    min_spread_percent_gross: float = 0.5
+    min_spread_percent_net: float = 0.3
+    min_profit_usd: float = 5.0
+    max_position_size_usd: float = 500.0
+    max_inventory_drift_percent: float = 15.0
+    max_per_exchange_drift_percent: float = 20.0
+    slippage_buffer_percent: float = 0.2
+    max_fee_impact_percent: float = 50.0
+    max_concurrent_trades: int = 3
+    max_opportunity_age_seconds: float = 10
+    max_validation_errors: int = 0  # stop checking after this many errors (0 = run every check)
@@ -3,8 +3,13 @@ Opportunity detector - scans for arbitrage opportunities.
 """
 import logging
 import asyncio
-from datetime import datetime
-from typing import List, Dict, Callable
+import time
+from typing import List, Dict, Callable, Optional, Tuple
+
+import numpy as np
+
+from engine.models import Opportunity, RiskLimits
+from engine.profit_kernel import score_candidates
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +26,41 @@ class OpportunityDetector:
         self.risk_manager = None
         self.position_tracker = None
         self.trade_executor = None
-        self.alert_callback = None  # Telegram alert function
+        self.alert_callback = None  # Queues a Telegram alert; returns without waiting for delivery
+        
+        # (exchange, pair) -> (monotonic fetch time, last price)
+        self._ticker_cache: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._rebuild_plan()
+    
+    def _rebuild_plan(self):
+        """Precompute the enabled (pair, exchanges) list, risk limits and scan thresholds from the config."""
+        trading_config = self.config['trading_config']
+        self.risk_limits = RiskLimits(**self.config.get('risk_limits', {}))
+        
+        self._scan_plan: List[Tuple[str, List[str]]] = [
+            (pair_config['pair'], list(pair_config['exchanges']))
+            for pair_config in self.config['trading_pairs']
+            if pair_config.get('enabled', True) and len(pair_config['exchanges']) >= 2
+        ]
+        # 'BTC/USDT' -> ('BTC', 'USDT'), parsed once per config
+        self._pair_parts: Dict[str, Tuple[str, str]] = {
+            pair: tuple(pair.split('/', 1)) for pair, _ in self._scan_plan
+        }
+        self._trade_amount = float(trading_config['trade_amount_usdt'])
+        self._min_spread = float(self.risk_limits.min_spread_percent_gross)
+        self._min_profit = float(self.risk_limits.min_profit_usd)
+        self.ticker_ttl = trading_config.get('ticker_cache_ttl_seconds', 1.0)
+    
+    def reload_config(self, config):
+        """Swap in a new config and rebuild the scan plan; on error the previous config stays in effect."""
+        previous = self.config
+        self.config = config
+        try:
+            self._rebuild_plan()
+        except Exception:
+            self.config = previous
+            self._rebuild_plan()
+            raise
     
     def set_risk_manager(self, risk_manager):
         """Set risk manager for validation."""
@@ -35,121 +74,195 @@ class OpportunityDetector:
         """Set trade executor for auto-execution."""
         self.trade_executor = executor
     
-    def set_alert_callback(self, callback: Callable):
-        """Set callback function for sending Telegram alerts."""
+    def set_alert_callback(self, callback: Callable[[str], None]):
+        """Set the (non-blocking) callback for queueing Telegram alerts."""
         self.alert_callback = callback
     
+    def _cached_price(self, exchange_name: str, pair: str, now: float) -> Optional[float]:
+        """Return the cached price if it is younger than the ticker TTL."""
+        cached = self._ticker_cache.get((exchange_name, pair))
+        if cached and now - cached[0] < self.ticker_ttl:
+            return cached[1]
+        return None
+    
+    def invalidate_ticker_cache(self, *exchange_names: str):
+        """Drop cached prices for the given exchanges (all exchanges if none given)."""
+        if not exchange_names:
+            self._ticker_cache.clear()
+            return
+        for key in [k for k in self._ticker_cache if k[0] in exchange_names]:
+            del self._ticker_cache[key]
+    
     async def get_price(self, exchange_name: str, pair: str) -> float:
-        """Fetch current price for a pair."""
+        """
+        Fetch the current price for a pair straight from the exchange (0 on error).
+        
+        For one-off lookups outside the scan, e.g. as calculate_profit's get_price;
+        scans use their own batched ticker fetch and execute_arbitrage fetches its own
+        live prices. The price is also stored in the ticker cache.
+        """
         try:
             ticker = await self.exchange_manager.fetch_ticker(exchange_name, pair)
-            return ticker['last']
+            price = ticker['last']
+            if price:
+                self._ticker_cache[(exchange_name, pair)] = (time.monotonic(), price)
+            return price
         except Exception as e:
             logger.error(f"Error fetching price for {pair} on {exchange_name}: {e}")
             return 0
     
-    async def scan_for_opportunities(self) -> List[Dict]:
+    async def _fetch_exchange_tickers(self, exchange_name: str, symbols: List[str]) -> Dict[str, dict]:
+        """Fetch tickers for all symbols on one exchange; errors yield no tickers."""
+        try:
+            return await self.exchange_manager.fetch_tickers(exchange_name, symbols)
+        except Exception as e:
+            logger.error(f"Error fetching tickers on {exchange_name}: {e}")
+            return {}
+    
+    async def scan_for_opportunities(self) -> List[Opportunity]:
         """
         Scan all configured pairs for arbitrage opportunities.
         
         Returns:
-            List of opportunity dicts
+            List of Opportunity records
         """
         opportunities = []
         
-        trade_amount = self.config['trading_config']['trade_amount_usdt']
-        pairs = self.config['trading_pairs']
-        risk_limits = self.config['risk_limits']
+        trade_amount = self._trade_amount
+        active_pairs = self._scan_plan
         
-        for pair_config in pairs:
-            if not pair_config.get('enabled', True):
-                continue
-            
-            pair = pair_config['pair']
-            exchanges = pair_config['exchanges']
-            
-            if len(exchanges) < 2:
-                continue
-            
-            # Fetch prices from all exchanges
-            prices = {}
+        # One ticker request per exchange for prices not fresh in the cache,
+        # all exchanges concurrently
+        scan_start = time.monotonic()
+        symbols_by_exchange: Dict[str, List[str]] = {}
+        for pair, exchanges in active_pairs:
             for exchange in exchanges:
-                price = await self.get_price(exchange, pair)
-                if price > 0:
-                    prices[exchange] = price
-            
+                if self._cached_price(exchange, pair, scan_start) is None:
+                    symbols_by_exchange.setdefault(exchange, []).append(pair)
+        
+        results = await asyncio.gather(
+            *(self._fetch_exchange_tickers(ex, syms) for ex, syms in symbols_by_exchange.items())
+        )
+        fetched_at = time.monotonic()
+        for (exchange, symbols), tickers in zip(symbols_by_exchange.items(), results):
+            for symbol in symbols:
+                ticker = tickers.get(symbol)
+                price = ticker.get('last') if ticker else None
+                if price and price > 0:
+                    self._ticker_cache[(exchange, symbol)] = (fetched_at, price)
+        
+        prices_by_pair: Dict[str, Dict[str, float]] = {}
+        for pair, exchanges in active_pairs:
+            for exchange in exchanges:
+                price = self._cached_price(exchange, pair, scan_start)
+                if price is not None:
+                    prices_by_pair.setdefault(pair, {})[exchange] = price
+        
+        # Cheapest and most expensive exchange per pair, in one pass over the prices
+        quotes = []
+        for pair, prices in prices_by_pair.items():
             if len(prices) < 2:
                 continue
-            
-            # Find cheapest and most expensive
-            cheapest_ex = min(prices, key=prices.get)
-            expensive_ex = max(prices, key=prices.get)
-            
-            buy_price = prices[cheapest_ex]
-            sell_price = prices[expensive_ex]
-            
-            # Calculate gross spread
-            gross_spread = ((sell_price - buy_price) / buy_price) * 100
-            
-            if gross_spread < risk_limits['min_spread_percent_gross']:
-                continue
-            
-            # Calculate quantity
-            quantity = trade_amount / buy_price
-            
-            # Fetch fees
-            buy_fee_pct = await self.fee_manager.get_taker_fee(cheapest_ex, pair)
-            sell_fee_pct = await self.fee_manager.get_maker_fee(expensive_ex, pair)
-            
-            # Calculate profit
-            buy_cost = trade_amount
-            buy_fee_usd = buy_cost * (buy_fee_pct / 100)
-            total_buy_cost = buy_cost + buy_fee_usd
-            
-            sell_revenue = quantity * sell_price
-            sell_fee_usd = sell_revenue * (sell_fee_pct / 100)
-            total_sell_revenue = sell_revenue - sell_fee_usd
-            
-            net_profit = total_sell_revenue - total_buy_cost
-            roi = (net_profit / total_buy_cost) * 100 if total_buy_cost > 0 else 0
-            
-            # Check profitability
-            if net_profit < risk_limits['min_profit_usd']:
-                continue
+            it = iter(prices.items())
+            cheapest_ex, buy_price = next(it)
+            expensive_ex, sell_price = cheapest_ex, buy_price
+            for exchange, price in it:
+                if price < buy_price:
+                    cheapest_ex, buy_price = exchange, price
+                elif price > sell_price:
+                    expensive_ex, sell_price = exchange, price
+            quotes.append((pair, cheapest_ex, expensive_ex, buy_price, sell_price))
+        
+        if not quotes:
+            return opportunities
+        
+        # Gross spread for all pairs at once
+        buy_prices = np.array([q[3] for q in quotes], dtype=np.float64)
+        sell_prices = np.array([q[4] for q in quotes], dtype=np.float64)
+        gross_spreads = ((sell_prices - buy_prices) / buy_prices) * 100
+        
+        candidates = np.nonzero(gross_spreads >= self._min_spread)[0]
+        if not len(candidates):
+            return opportunities
+        
+        # Fetch fees for the remaining pairs - taker on the buy side, maker on the sell side
+        fee_results = await asyncio.gather(*(
+            self.fee_manager.get_trading_fees(exchange, quotes[i][0])
+            for i in candidates
+            for exchange in (quotes[i][1], quotes[i][2])
+        ))
+        buy_fee_pcts = np.array([fees['taker'] for fees in fee_results[0::2]], dtype=np.float64)
+        sell_fee_pcts = np.array([fees['maker'] for fees in fee_results[1::2]], dtype=np.float64)
+        
+        # Calculate profit
+        buy_prices = buy_prices[candidates]
+        sell_prices = sell_prices[candidates]
+        (profitable_mask, quantities, sell_revenues, buy_fees_usd,
+         sell_fees_usd, net_profits, rois) = score_candidates(
+            buy_prices, sell_prices, buy_fee_pcts, sell_fee_pcts,
+            self._trade_amount, self._min_profit
+        )
+        
+        # Check profitability
+        profitable = np.flatnonzero(profitable_mask).tolist()
+        
+        gross_spreads = gross_spreads[candidates].tolist()
+        buy_prices = buy_prices.tolist()
+        sell_prices = sell_prices.tolist()
+        quantities = quantities.tolist()
+        sell_revenues = sell_revenues.tolist()
+        buy_fees_usd = buy_fees_usd.tolist()
+        sell_fees_usd = sell_fees_usd.tolist()
+        net_profits = net_profits.tolist()
+        rois = rois.tolist()
+        
+        found = []
+        detected_at = time.monotonic()
+        for j in profitable:
+            pair, cheapest_ex, expensive_ex = quotes[candidates[j]][:3]
+            base, quote = self._pair_parts[pair]
             
             # Opportunity found!
-            opportunity = {
-                'pair': pair,
-                'buy_exchange': cheapest_ex,
-                'sell_exchange': expensive_ex,
-                'buy_price': buy_price,
-                'sell_price': sell_price,
-                'quantity': quantity,
-                'trade_amount': trade_amount,
-                'gross_spread': gross_spread,
-                'gross_profit': sell_revenue - buy_cost,
-                'buy_fee': buy_fee_usd,
-                'sell_fee': sell_fee_usd,
-                'total_fees': buy_fee_usd + sell_fee_usd,
-                'net_profit': net_profit,
-                'roi': roi,
-                'timestamp': datetime.now()
-            }
-            
-            # Risk validation if risk manager available
-            if self.risk_manager:
-                is_valid, errors = await self.risk_manager.validate_opportunity(
-                    opportunity,
-                    self.config,
-                    self.position_tracker
-                )
-                
-                if not is_valid:
-                    logger.warning(f"Risk validation failed for {pair}: {errors}")
-                    continue
+            found.append(Opportunity(
+                pair=pair,
+                base=base,
+                quote=quote,
+                buy_exchange=cheapest_ex,
+                sell_exchange=expensive_ex,
+                buy_price=buy_prices[j],
+                sell_price=sell_prices[j],
+                quantity=quantities[j],
+                trade_amount=trade_amount,
+                gross_spread=gross_spreads[j],
+                gross_profit=sell_revenues[j] - trade_amount,
+                buy_fee=buy_fees_usd[j],
+                sell_fee=sell_fees_usd[j],
+                total_fees=buy_fees_usd[j] + sell_fees_usd[j],
+                net_profit=net_profits[j],
+                roi=rois[j],
+                timestamp=detected_at
+            ))
+        
+        # Risk validation if risk manager available - one batch per scan
+        if self.risk_manager and found:
+            results = await self.risk_manager.validate_opportunities(
+                found,
+                self.risk_limits,
+                self.position_tracker
+            )
+        else:
+            results = [(True, [])] * len(found)
+        
+        for opportunity, (is_valid, errors) in zip(found, results):
+            if not is_valid:
+                logger.warning(f"Risk validation failed for {opportunity.pair}: {errors}")
+                continue
             
             opportunities.append(opportunity)
-            logger.info(f"💰 Opportunity found: {pair} - ${net_profit:.2f} profit ({roi:.2f}%)")
+            logger.info(
+                f"💰 Opportunity found: {opportunity.pair} - "
+                f"${opportunity.net_profit:.2f} profit ({opportunity.roi:.2f}%)"
+            )
         
         return opportunities
     
@@ -187,6 +300,8 @@ class OpportunityDetector:
         
         logger.info(f"Monitoring loop started (interval: {interval}s, auto_execute: {auto_execute})")
         
+        # Scans run on a fixed schedule, so slow scans don't stretch the period
+        next_tick = time.monotonic()
         while self.monitoring_active:
             try:
                 # Scan for opportunities
@@ -196,47 +311,54 @@ class OpportunityDetector:
                     if auto_execute and not require_approval:
                         # Auto-execute
                         if self.trade_executor:
-                            logger.info(f"Auto-executing trade for {opp['pair']}")
+                            logger.info(f"Auto-executing trade for {opp.pair}")
                             success, result = await self.trade_executor.execute_arbitrage(opp)
+                            # Our own orders moved these books - don't trust cached prices
+                            self.invalidate_ticker_cache(opp.buy_exchange, opp.sell_exchange)
                             
                             if success:
-                                await self._send_alert(f"✅ Trade executed: {opp['pair']} - Profit: ${result['profit']['net']:.2f}")
+                                self._send_alert(f"✅ Trade executed: {opp.pair} - Profit: ${result['profit']['net']:.2f}")
                             else:
-                                await self._send_alert(f"❌ Trade failed: {opp['pair']} - {result}")
+                                self._send_alert(f"❌ Trade failed: {opp.pair} - {result}")
                     else:
                         # Send alert for manual approval
-                        await self._send_opportunity_alert(opp)
-                
-                # Wait before next scan
-                await asyncio.sleep(interval)
+                        self._send_opportunity_alert(opp)
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
-                await asyncio.sleep(interval)
+            
+            # Wait for the next scheduled scan; skip the missed ticks if this one overran
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                logger.warning(f"Scan overran the {interval}s interval by {-delay:.2f}s")
+                next_tick = time.monotonic()
     
-    async def _send_opportunity_alert(self, opp: Dict):
-        """Send opportunity alert via Telegram."""
+    def _send_opportunity_alert(self, opp: Opportunity):
+        """Queue an opportunity alert for Telegram."""
         if not self.alert_callback:
             return
         
         alert_text = (
             f"💰 *Opportunity Detected*\n\n"
-            f"Pair: {opp['pair']}\n"
-            f"Buy: {opp['buy_exchange']} @ ${opp['buy_price']:.6f}\n"
-            f"Sell: {opp['sell_exchange']} @ ${opp['sell_price']:.6f}\n\n"
-            f"Net Profit: ${opp['net_profit']:.2f} ({opp['roi']:.2f}%)\n"
-            f"Fees: ${opp['total_fees']:.2f}\n\n"
+            f"Pair: {opp.pair}\n"
+            f"Buy: {opp.buy_exchange} @ ${opp.buy_price:.6f}\n"
+            f"Sell: {opp.sell_exchange} @ ${opp.sell_price:.6f}\n\n"
+            f"Net Profit: ${opp.net_profit:.2f} ({opp.roi:.2f}%)\n"
+            f"Fees: ${opp.total_fees:.2f}\n\n"
             f"Use /execute to trade"
         )
         
-        await self.alert_callback(alert_text)
+        self.alert_callback(alert_text)
     
-    async def _send_alert(self, text: str):
-        """Send generic alert."""
+    def _send_alert(self, text: str):
+        """Queue a generic alert."""
         if self.alert_callback:
-            await self.alert_callback(text)
+            self.alert_callback(text)
     
     def is_monitoring(self) -> bool:
         """Check if monitoring is active."""
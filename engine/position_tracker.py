@@ -1,16 +1,21 @@
 """
 Position Tracker - Tracks holdings across all exchanges.
 """
+import asyncio
 import logging
-import json
-import aiofiles
+import time
+from collections import defaultdict
 from pathlib import Path
 from typing import Dict
 from config import POSITIONS_FILE
 from utils.drift_calculator import calculate_drift
+from utils.json_io import dump_json, read_json, write_bytes_atomic
 
 logger = logging.getLogger(__name__)
 
+# Delay between a position change and writing it to disk
+POSITIONS_FLUSH_SECONDS = 1
+
 
 class PositionTracker:
     """Tracks positions and inventory across exchanges."""
@@ -18,25 +23,48 @@ class PositionTracker:
     def __init__(self, exchange_manager):
         self.exchange_manager = exchange_manager
         self.initial_balances = {}
-        self.current_positions = {}
+        self.current_positions: Dict[str, Dict[str, float]] = {}  # exchange -> defaultdict(float)
+        # Bumped whenever balances change, so derived data (e.g. drift) can be cached
+        self.version = 0
+        self._save_pending = False
+        self._flush_task = None
+        exchange_manager.register_close_hook(self.flush)
+    
+    @staticmethod
+    def _extract_free_balances(balance: Dict) -> Dict[str, float]:
+        """Extract positive free balances per currency from a ccxt balance."""
+        positions = {}
+        for currency, data in balance.items():
+            if isinstance(data, dict) and 'free' in data:
+                free_amount = data['free']
+                if free_amount > 0:
+                    positions[currency] = free_amount
+        return positions
+    
+    async def _fetch_all_positions(self) -> Dict[str, Dict[str, float]]:
+        """Fetch free balances from all exchanges concurrently; failed exchanges are skipped."""
+        names = list(self.exchange_manager.exchanges.keys())
+        balances = await asyncio.gather(
+            *(self.exchange_manager.fetch_balance(name) for name in names),
+            return_exceptions=True
+        )
+        
+        positions_by_exchange = {}
+        for exchange_name, balance in zip(names, balances):
+            if isinstance(balance, Exception):
+                logger.error(f"Error fetching balance from {exchange_name}: {balance}")
+                continue
+            positions_by_exchange[exchange_name] = self._extract_free_balances(balance)
+        return positions_by_exchange
     
     async def initialize(self):
         """Initialize by fetching current balances as baseline."""
         try:
             # Fetch balances from all exchanges
-            for exchange_name in self.exchange_manager.exchanges.keys():
-                balance = await self.exchange_manager.fetch_balance(exchange_name)
-                
-                # Extract free balances
-                positions = {}
-                for currency, data in balance.items():
-                    if isinstance(data, dict) and 'free' in data:
-                        free_amount = data['free']
-                        if free_amount > 0:
-                            positions[currency] = free_amount
-                
+            for exchange_name, positions in (await self._fetch_all_positions()).items():
                 self.initial_balances[exchange_name] = positions
-                self.current_positions[exchange_name] = positions.copy()
+                self.current_positions[exchange_name] = defaultdict(float, positions)
+            self.version += 1
             
             # Save initial state
             await self.save_positions()
@@ -49,48 +77,65 @@ class PositionTracker:
         """Load positions from file."""
         if POSITIONS_FILE.exists():
             try:
-                async with aiofiles.open(POSITIONS_FILE, 'r') as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                    
-                    self.initial_balances = data.get('initial_balances', {})
-                    self.current_positions = data.get('current_positions', {})
-                    
+                data = await asyncio.to_thread(read_json, POSITIONS_FILE)
+                
+                self.initial_balances = data.get('initial_balances', {})
+                self.current_positions = {
+                    exchange: defaultdict(float, positions)
+                    for exchange, positions in data.get('current_positions', {}).items()
+                }
+                self.version += 1
+                
                 logger.info("Positions loaded from file")
             except Exception as e:
                 logger.error(f"Error loading positions: {e}")
     
     async def save_positions(self):
         """Save positions to file."""
+        self._save_pending = False
         try:
             data = {
                 'initial_balances': self.initial_balances,
-                'current_positions': self.current_positions,
-                'last_updated': None  # TODO: Add timestamp
+                'current_positions': {
+                    exchange: dict(positions)
+                    for exchange, positions in self.current_positions.items()
+                },
+                'last_updated': time.time()
             }
             
-            async with aiofiles.open(POSITIONS_FILE, 'w') as f:
-                await f.write(json.dumps(data, indent=2))
+            # Serialize here so the snapshot can't change while the thread writes it
+            content = dump_json(data)
+            await asyncio.to_thread(write_bytes_atomic, POSITIONS_FILE, content)
                 
         except Exception as e:
+            # Keep the changes pending so the next scheduled save or flush retries them
+            self._save_pending = True
             logger.error(f"Error saving positions: {e}")
     
+    async def flush(self):
+        """Save positions if a scheduled save is still pending."""
+        if self._save_pending:
+            await self.save_positions()
+    
+    def _schedule_save(self):
+        """Mark positions dirty and make sure a delayed save is pending."""
+        self._save_pending = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+    
+    async def _delayed_flush(self):
+        """Save positions after POSITIONS_FLUSH_SECONDS, batching changes made meanwhile."""
+        await asyncio.sleep(POSITIONS_FLUSH_SECONDS)
+        await self.flush()
+    
     async def refresh_positions(self):
         """Fetch latest balances from all exchanges."""
         try:
-            for exchange_name in self.exchange_manager.exchanges.keys():
-                balance = await self.exchange_manager.fetch_balance(exchange_name)
-                
-                positions = {}
-                for currency, data in balance.items():
-                    if isinstance(data, dict) and 'free' in data:
-                        free_amount = data['free']
-                        if free_amount > 0:
-                            positions[currency] = free_amount
-                
-                self.current_positions[exchange_name] = positions
+            for exchange_name, positions in (await self._fetch_all_positions()).items():
+                self.current_positions[exchange_name] = defaultdict(float, positions)
+            self.version += 1
             
-            await self.save_positions()
+            self._schedule_save()
             logger.info("Positions refreshed")
             
         except Exception as e:
@@ -112,19 +157,18 @@ class PositionTracker:
             
             # Update buy exchange (spent USDT, received crypto)
             if buy_exchange in self.current_positions:
-                self.current_positions[buy_exchange][quote_currency] = \
-                    self.current_positions[buy_exchange].get(quote_currency, 0) - buy_cost
-                self.current_positions[buy_exchange][base_currency] = \
-                    self.current_positions[buy_exchange].get(base_currency, 0) + quantity
+                buy_positions = self.current_positions[buy_exchange]
+                buy_positions[quote_currency] -= buy_cost
+                buy_positions[base_currency] += quantity
             
             # Update sell exchange (spent crypto, received USDT)
             if sell_exchange in self.current_positions:
-                self.current_positions[sell_exchange][base_currency] = \
-                    self.current_positions[sell_exchange].get(base_currency, 0) - quantity
-                self.current_positions[sell_exchange][quote_currency] = \
-                    self.current_positions[sell_exchange].get(quote_currency, 0) + sell_revenue
+                sell_positions = self.current_positions[sell_exchange]
+                sell_positions[base_currency] -= quantity
+                sell_positions[quote_currency] += sell_revenue
+            self.version += 1
             
-            await self.save_positions()
+            self._schedule_save()
             logger.info(f"Positions updated after trade {trade_record.get('trade_id')}")
             
         except Exception as e:
@@ -152,8 +196,9 @@ class PositionTracker:
     async def reset_baseline(self):
         """Reset initial balances to current state (after manual rebalancing)."""
         self.initial_balances = {
-            exchange: positions.copy()
+            exchange: dict(positions)
             for exchange, positions in self.current_positions.items()
         }
+        self.version += 1
         await self.save_positions()
         logger.info("Baseline reset to current positions")
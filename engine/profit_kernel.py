@@ -0,0 +1,75 @@
+"""
+Profit kernel - net profit and ROI for a batch of arbitrage candidates.
+
+Uses a numba-compiled loop when numba is installed, NumPy array math otherwise.
+Both take float64 arrays of shape (n,) and return the same tuple:
+(profitable_mask, quantities, sell_revenues, buy_fees_usd, sell_fees_usd, net_profits, rois)
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _score_loop(buy_prices, sell_prices, buy_fee_pcts, sell_fee_pcts, trade_amount, min_profit):
+    """Elementwise loop version of the kernel (compiled with numba when available)."""
+    n = buy_prices.shape[0]
+    profitable = np.zeros(n, np.bool_)
+    quantities = np.empty(n)
+    sell_revenues = np.empty(n)
+    buy_fees_usd = np.empty(n)
+    sell_fees_usd = np.empty(n)
+    net_profits = np.empty(n)
+    rois = np.empty(n)
+
+    for i in range(n):
+        quantity = trade_amount / buy_prices[i]
+        buy_fee_usd = trade_amount * (buy_fee_pcts[i] / 100.0)
+        total_buy_cost = trade_amount + buy_fee_usd
+
+        sell_revenue = quantity * sell_prices[i]
+        sell_fee_usd = sell_revenue * (sell_fee_pcts[i] / 100.0)
+        net_profit = (sell_revenue - sell_fee_usd) - total_buy_cost
+
+        quantities[i] = quantity
+        sell_revenues[i] = sell_revenue
+        buy_fees_usd[i] = buy_fee_usd
+        sell_fees_usd[i] = sell_fee_usd
+        net_profits[i] = net_profit
+        rois[i] = (net_profit * 100.0) / total_buy_cost if total_buy_cost > 0 else 0.0
+        profitable[i] = net_profit >= min_profit
+
+    return profitable, quantities, sell_revenues, buy_fees_usd, sell_fees_usd, net_profits, rois
+
+
+def _score_numpy(buy_prices, sell_prices, buy_fee_pcts, sell_fee_pcts, trade_amount, min_profit):
+    """Array math version of the kernel."""
+    quantities = trade_amount / buy_prices
+    buy_fees_usd = trade_amount * (buy_fee_pcts / 100)
+    total_buy_costs = trade_amount + buy_fees_usd
+
+    sell_revenues = quantities * sell_prices
+    sell_fees_usd = sell_revenues * (sell_fee_pcts / 100)
+    net_profits = (sell_revenues - sell_fees_usd) - total_buy_costs
+
+    rois = np.divide(
+        net_profits * 100, total_buy_costs,
+        out=np.zeros_like(net_profits), where=total_buy_costs > 0
+    )
+    return net_profits >= min_profit, quantities, sell_revenues, buy_fees_usd, sell_fees_usd, net_profits, rois
+
+
+score_candidates = njit(cache=True)(_score_loop) if njit else _score_numpy
+
+
+def warm_up():
+    """
+    Run the kernel once on a one-element batch.
+    
+    The numba version compiles on first call (or loads its on-disk cache); doing that
+    at startup, off the event loop, keeps the first scan from stalling on it.
+    """
+    one = np.ones(1)
+    score_candidates(one, one, one, one, 1.0, 0.0)
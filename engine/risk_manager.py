@@ -2,74 +2,118 @@
 Risk Manager - Validates all risk limits before trade execution.
 """
 import logging
-from datetime import datetime
+import time
+from dataclasses import dataclass
 from typing import Dict, List, Tuple
 
+from engine.models import Opportunity, RiskLimits
+
 logger = logging.getLogger(__name__)
 
+# How long drift data is reused while positions are unchanged
+DRIFT_CACHE_TTL_SECONDS = 3.0
+
+
+@dataclass(slots=True)
+class ActiveTrade:
+    """A trade counted against the concurrent trade limit."""
+    id: str
+    registered_at: float  # time.monotonic()
+
 
 class RiskManager:
     """Manages risk validation for arbitrage opportunities."""
     
     def __init__(self):
-        self.active_trades = []  # Track concurrent trades
+        self.active_trades: Dict[str, ActiveTrade] = {}  # trade_id -> trade info, for concurrency limits
+        # Last drift result, keyed by (tracker, tracker.version)
+        self._drift_cache = None
+        self._drift_cache_key = None
+        self._drift_cache_ts = 0.0
     
     async def validate_opportunity(
         self,
-        opportunity: Dict,
-        config: Dict,
+        opportunity: Opportunity,
+        risk_limits: RiskLimits,
         position_tracker=None
     ) -> Tuple[bool, List[str]]:
         """
         Validate opportunity against all risk limits.
         
         Args:
-            opportunity: Opportunity data with prices, profit, etc.
-            config: Configuration with risk limits
+            opportunity: Opportunity with prices, profit, etc.
+            risk_limits: Risk limits built from the config
             position_tracker: Optional position tracker for drift checks
         
         Returns:
             (is_valid, errors): Tuple of validation result and error messages
         """
-        errors = []
-        risk_limits = config.get('risk_limits', {})
-        
-        # 1. SPREAD VALIDATION
-        spread_errors = await self._validate_spread(opportunity, risk_limits)
-        errors.extend(spread_errors)
-        
-        # 2. PROFIT VALIDATION
-        profit_errors = await self._validate_profit(opportunity, risk_limits)
-        errors.extend(profit_errors)
-        
-        # 3. POSITION LIMITS
-        position_errors = await self._validate_position_limits(opportunity, risk_limits)
-        errors.extend(position_errors)
-        
-        # 4. INVENTORY DRIFT (if position tracker available)
-        if position_tracker:
-            drift_errors = await self._validate_drift(position_tracker, risk_limits)
-            errors.extend(drift_errors)
+        results = await self.validate_opportunities([opportunity], risk_limits, position_tracker)
+        return results[0]
+    
+    async def validate_opportunities(
+        self,
+        opportunities: List[Opportunity],
+        risk_limits: RiskLimits,
+        position_tracker=None
+    ) -> List[Tuple[bool, List[str]]]:
+        """
+        Validate a batch of opportunities against all risk limits.
         
-        # 5. PRICE MOVEMENT CHECK
-        price_errors = await self._validate_price_stability(opportunity, risk_limits)
-        errors.extend(price_errors)
+        Checks on shared state (inventory drift) run once for the whole batch.
         
-        is_valid = len(errors) == 0
+        Returns:
+            List of (is_valid, errors) tuples, parallel to opportunities
+        """
+        # Stop running further checks once this many errors are found (0 = run every check)
+        max_errors = risk_limits.max_validation_errors or float('inf')
+        drift_errors = None  # computed when first needed
+        results = []
         
-        if not is_valid:
-            logger.warning(f"Risk validation failed for {opportunity.get('pair')}: {errors}")
-        else:
-            logger.info(f"Risk validation passed for {opportunity.get('pair')}")
+        for opportunity in opportunities:
+            errors = []
+            
+            # Cheapest checks first; drift is the most expensive local check (its result
+            # is cached) and only matters if everything else passes, so it runs last
+            
+            # 1. PROFIT VALIDATION
+            errors.extend(self._validate_profit(opportunity, risk_limits))
+            
+            # 2. SPREAD VALIDATION
+            if len(errors) < max_errors:
+                errors.extend(self._validate_spread(opportunity, risk_limits))
+            
+            # 3. POSITION LIMITS
+            if len(errors) < max_errors:
+                errors.extend(self._validate_position_limits(opportunity, risk_limits))
+            
+            # 4. PRICE MOVEMENT CHECK
+            if len(errors) < max_errors:
+                errors.extend(self._validate_price_stability(opportunity, risk_limits))
+            
+            # 5. INVENTORY DRIFT (if position tracker available) - only if nothing else failed
+            if position_tracker and not errors:
+                if drift_errors is None:
+                    drift_errors = await self._validate_drift(position_tracker, risk_limits)
+                errors.extend(drift_errors)
+            
+            is_valid = len(errors) == 0
+            
+            if not is_valid:
+                logger.warning("Risk validation failed for %s: %s", opportunity.pair, errors)
+            else:
+                logger.info("Risk validation passed for %s", opportunity.pair)
+            
+            results.append((is_valid, errors))
         
-        return is_valid, errors
+        return results
     
-    async def _validate_spread(self, opportunity: Dict, limits: Dict) -> List[str]:
+    def _validate_spread(self, opportunity: Opportunity, limits: RiskLimits) -> List[str]:
         """Validate spread requirements."""
         errors = []
         
-        buy_price = opportunity.get('buy_price', 0)
-        sell_price = opportunity.get('sell_price', 0)
+        buy_price = opportunity.buy_price
+        sell_price = opportunity.sell_price
         
         if buy_price <= 0 or sell_price <= 0:
             errors.append("Invalid prices")
@@ -78,17 +122,17 @@ class RiskManager:
         # Calculate gross spread
         gross_spread = ((sell_price - buy_price) / buy_price) * 100
         
-        min_gross = limits.get('min_spread_percent_gross', 0.5)
+        min_gross = limits.min_spread_percent_gross
         if gross_spread < min_gross:
             errors.append(
                 f"Gross spread {gross_spread:.3f}% below minimum {min_gross}%"
             )
         
         # Calculate net spread (after fees)
-        total_fees_pct = (opportunity.get('total_fees', 0) / opportunity.get('trade_amount', 1)) * 100
+        total_fees_pct = (opportunity.total_fees / opportunity.trade_amount) * 100
         net_spread = gross_spread - total_fees_pct
         
-        min_net = limits.get('min_spread_percent_net', 0.3)
+        min_net = limits.min_spread_percent_net
         if net_spread < min_net:
             errors.append(
                 f"Net spread {net_spread:.3f}% below minimum {min_net}%"
@@ -96,16 +140,16 @@ class RiskManager:
         
         return errors
     
-    async def _validate_profit(self, opportunity: Dict, limits: Dict) -> List[str]:
+    def _validate_profit(self, opportunity: Opportunity, limits: RiskLimits) -> List[str]:
         """Validate profit requirements."""
         errors = []
         
-        net_profit = opportunity.get('net_profit', 0)
-        total_fees = opportunity.get('total_fees', 0)
-        gross_profit = opportunity.get('gross_profit', 0)
+        net_profit = opportunity.net_profit
+        total_fees = opportunity.total_fees
+        gross_profit = opportunity.gross_profit
         
         # Check minimum profit
-        min_profit = limits.get('min_profit_usd', 5.0)
+        min_profit = limits.min_profit_usd
         if net_profit < min_profit:
             errors.append(
                 f"Net profit ${net_profit:.2f} below minimum ${min_profit:.2f}"
@@ -114,7 +158,7 @@ class RiskManager:
         # Check fees don't eat >50% of gross profit
         if gross_profit > 0:
             fee_impact_pct = (total_fees / gross_profit) * 100
-            max_fee_impact = limits.get('max_fee_impact_percent', 50.0)
+            max_fee_impact = limits.max_fee_impact_percent
             
             if fee_impact_pct > max_fee_impact:
                 errors.append(
@@ -123,21 +167,21 @@ class RiskManager:
         
         return errors
     
-    async def _validate_position_limits(self, opportunity: Dict, limits: Dict) -> List[str]:
+    def _validate_position_limits(self, opportunity: Opportunity, limits: RiskLimits) -> List[str]:
         """Validate position size and concurrent trade limits."""
         errors = []
         
-        trade_amount = opportunity.get('trade_amount', 0)
+        trade_amount = opportunity.trade_amount
         
         # Check max trade size
-        max_trade = limits.get('max_position_size_usd', 500.0)
+        max_trade = limits.max_position_size_usd
         if trade_amount > max_trade:
             errors.append(
                 f"Trade amount ${trade_amount:.2f} exceeds maximum ${max_trade:.2f}"
             )
         
         # Check concurrent trades
-        max_concurrent = limits.get('max_concurrent_trades', 3)
+        max_concurrent = limits.max_concurrent_trades
         if len(self.active_trades) >= max_concurrent:
             errors.append(
                 f"Already have {len(self.active_trades)} active trades (max {max_concurrent})"
@@ -145,15 +189,15 @@ class RiskManager:
         
         return errors
     
-    async def _validate_drift(self, position_tracker, limits: Dict) -> List[str]:
+    async def _validate_drift(self, position_tracker, limits: RiskLimits) -> List[str]:
         """Validate inventory drift is within limits."""
         errors = []
         
         try:
-            drift_data = await position_tracker.calculate_drift()
+            drift_data = await self._get_drift(position_tracker)
             
             overall_drift = drift_data.get('overall_drift_percent', 0)
-            max_overall = limits.get('max_inventory_drift_percent', 15.0)
+            max_overall = limits.max_inventory_drift_percent
             
             if overall_drift > max_overall:
                 errors.append(
@@ -161,7 +205,7 @@ class RiskManager:
                 )
             
             # Check per-exchange drift
-            max_per_exchange = limits.get('max_per_exchange_drift_percent', 20.0)
+            max_per_exchange = limits.max_per_exchange_drift_percent
             by_exchange = drift_data.get('by_exchange', {})
             
             for exchange, drift in by_exchange.items():
@@ -171,22 +215,43 @@ class RiskManager:
                     )
         
         except Exception as e:
-            logger.error(f"Error checking drift: {e}")
+            logger.error("Error checking drift: %s", e)
             # Don't block trade on drift check error
         
         return errors
     
-    async def _validate_price_stability(self, opportunity: Dict, limits: Dict) -> List[str]:
+    async def _get_drift(self, position_tracker) -> Dict:
+        """Get drift data, reusing the last result while positions are unchanged and it is fresh."""
+        key = (id(position_tracker), position_tracker.version)
+        now = time.monotonic()
+        if (
+            self._drift_cache is not None
+            and self._drift_cache_key == key
+            and now - self._drift_cache_ts < DRIFT_CACHE_TTL_SECONDS
+        ):
+            return self._drift_cache
+        
+        drift_data = await position_tracker.calculate_drift()
+        self._drift_cache = drift_data
+        self._drift_cache_key = key
+        self._drift_cache_ts = now
+        return drift_data
+    
+    def invalidate_drift_cache(self):
+        """Force the next drift check to recalculate."""
+        self._drift_cache = None
+    
+    def _validate_price_stability(self, opportunity: Opportunity, limits: RiskLimits) -> List[str]:
         """Check price hasn't moved significantly since detection."""
         errors = []
         
         # This would require storing initial detection time and price
         # For now, we can add a timestamp check
-        timestamp = opportunity.get('timestamp')
+        timestamp = opportunity.timestamp
         if timestamp:
             # If opportunity is older than X seconds, flag it
-            age_seconds = (datetime.now() - timestamp).total_seconds()
-            max_age = limits.get('max_opportunity_age_seconds', 10)
+            age_seconds = time.monotonic() - timestamp
+            max_age = limits.max_opportunity_age_seconds
             
             if age_seconds > max_age:
                 errors.append(
@@ -197,18 +262,15 @@ class RiskManager:
     
     def register_trade(self, trade_id: str):
         """Register a trade as active."""
-        self.active_trades.append({
-            'id': trade_id,
-            'timestamp': datetime.now()
-        })
-        logger.info(f"Registered active trade: {trade_id}")
+        self.active_trades[trade_id] = ActiveTrade(trade_id, time.monotonic())
+        self.invalidate_drift_cache()
+        logger.info("Registered active trade: %s", trade_id)
     
     def complete_trade(self, trade_id: str):
         """Mark a trade as completed."""
-        self.active_trades = [
-            t for t in self.active_trades if t['id'] != trade_id
-        ]
-        logger.info(f"Completed trade: {trade_id}")
+        self.active_trades.pop(trade_id, None)
+        self.invalidate_drift_cache()
+        logger.info("Completed trade: %s", trade_id)
     
     def get_active_trade_count(self) -> int:
         """Get number of currently active trades."""
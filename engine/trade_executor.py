@@ -3,62 +3,149 @@ Trade executor with mandatory pre-execution validation.
 CRITICAL: Checks balance and profitability before EVERY trade.
 """
 import asyncio
+import itertools
 import logging
+import time
 from datetime import datetime
 from typing import Dict, Tuple, Optional
 
+from config import TRADES_FILE
+from engine.models import Opportunity
+from utils.json_io import dump_json
+
 logger = logging.getLogger(__name__)
 
+# Order fill polling: first check after the initial delay, doubling up to the max
+ORDER_POLL_INITIAL_DELAY = 0.05
+ORDER_POLL_MAX_DELAY = 0.5
+ORDER_FILL_TIMEOUT_SECONDS = 5.0
+
+# Relative change in live prices below which the detected profit is reused instead of recalculated
+PRICE_UNCHANGED_TOLERANCE = 1e-4
+
+
+async def _wait_filled(exchange, order_id: str, pair: str, timeout: float = ORDER_FILL_TIMEOUT_SECONDS) -> Dict:
+    """
+    Poll an order with exponential backoff until it leaves the 'open' state.
+    
+    Returns the last fetched order; its status is still 'open' if the timeout expired.
+    """
+    deadline = time.monotonic() + timeout
+    delay = ORDER_POLL_INITIAL_DELAY
+    while True:
+        await asyncio.sleep(delay)
+        order = await exchange.fetch_order(order_id, pair)
+        remaining = deadline - time.monotonic()
+        if order['status'] != 'open' or remaining <= 0:
+            return order
+        delay = min(delay * 2, ORDER_POLL_MAX_DELAY, remaining)
+
+
+# Per-process sequence number, so trade ids are unique even within one clock tick
+_trade_seq = itertools.count()
+
+# Keeps concurrent trades' lines from interleaving in the trade log
+_trades_file_lock = asyncio.Lock()
+
+
+def _append_trade_record(trade_record: Dict):
+    """Append a trade record to the trade log as one JSON line (blocking)."""
+    line = dump_json(trade_record, indent=False) + b"\n"
+    with open(TRADES_FILE, 'ab') as f:
+        f.write(line)
+
+
+async def save_trade_record(trade_record: Dict):
+    """Persist a completed trade; failures are logged, not raised."""
+    try:
+        async with _trades_file_lock:
+            await asyncio.to_thread(_append_trade_record, trade_record)
+    except Exception as e:
+        logger.error("Error saving trade record %s: %s", trade_record.get('trade_id'), e)
+
+
+async def _fetch_live_price(exchange, pair: str) -> float:
+    """Fetch the last traded price straight from the exchange (never from a cache)."""
+    ticker = await exchange.fetch_ticker(pair)
+    price = ticker.get('last')
+    if not price or price <= 0:
+        raise ValueError(f"No current price for {pair} on {exchange.id}")
+    return price
+
 
 async def execute_arbitrage(
-    opportunity: Dict,
+    opportunity: Opportunity,
     exchanges: Dict,
-    send_telegram_alert,
-    calculate_profit,
-    get_price
+    queue_alert,
+    calculate_profit
 ) -> Tuple[bool, str]:
     """
     Execute trade with equal USD amounts - WITH PRE-EXECUTION VALIDATION
     
     Args:
-        opportunity: Validated opportunity dict containing:
-            - pair, buy_exchange, sell_exchange
-            - trade_amount, quantity
-            - buy_price, sell_price, net_profit
+        opportunity: Validated Opportunity (uses pair, buy_exchange, sell_exchange,
+            trade_amount, quantity, buy_price, sell_price, net_profit)
         exchanges: Dict of initialized CCXT exchange objects
-        send_telegram_alert: Function to send Telegram messages
+        queue_alert: Function that queues a Telegram message (returns immediately)
         calculate_profit: Function to recalculate profit
-        get_price: Function to fetch current price
     
     Returns:
         Tuple[bool, str]: (success, message/error)
     """
-    pair = opportunity['pair']
-    buy_exchange = opportunity['buy_exchange']
-    sell_exchange = opportunity['sell_exchange']
-    trade_amount = opportunity['trade_amount']
-    quantity = opportunity['quantity']
-    base_currency = pair.split('/')[0]  # e.g., 'BTC' from 'BTC/USDT'
-    quote_currency = pair.split('/')[1]  # e.g., 'USDT' from 'BTC/USDT'
+    pair = opportunity.pair
+    buy_exchange = opportunity.buy_exchange
+    sell_exchange = opportunity.sell_exchange
+    trade_amount = opportunity.trade_amount
+    quantity = opportunity.quantity
+    net_profit = opportunity.net_profit
+    base_currency = opportunity.base  # e.g., 'BTC' from 'BTC/USDT'
+    quote_currency = opportunity.quote  # e.g., 'USDT' from 'BTC/USDT'
     
     try:
         # ═══════════════════════════════════════════════════════════
         # PRE-EXECUTION VALIDATION (CRITICAL - DO NOT SKIP)
         # ═══════════════════════════════════════════════════════════
         
-        logger.info(f"🔍 Starting pre-execution validation for {pair}")
+        logger.info("🔍 Starting pre-execution validation for %s", pair)
         
         # 1. VERIFY TRADE PROFITABILITY (MANDATORY)
-        if opportunity['net_profit'] <= 0:
-            error_msg = f"❌ TRADE REJECTED: Not profitable! Net profit = ${opportunity['net_profit']:.2f}"
+        if net_profit <= 0:
+            error_msg = f"❌ TRADE REJECTED: Not profitable! Net profit = ${net_profit:.2f}"
             logger.error(error_msg)
-            await send_telegram_alert(error_msg)
+            queue_alert(error_msg)
             return False, error_msg
         
-        logger.info(f"✅ Profitability check passed: Net profit = ${opportunity['net_profit']:.2f}")
+        logger.info("✅ Profitability check passed: Net profit = $%.2f", net_profit)
+        
+        # Balances and current prices are independent requests - issue them
+        # all at once, then run the checks in order
+        results = await asyncio.gather(
+            exchanges[buy_exchange].fetch_balance(),
+            exchanges[sell_exchange].fetch_balance(),
+            _fetch_live_price(exchanges[buy_exchange], pair),
+            _fetch_live_price(exchanges[sell_exchange], pair),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        buy_balance, sell_balance, current_buy_price, current_sell_price = results
+        
+        # Recalculate profit from the live prices just fetched, unless neither has really
+        # moved since detection - both come straight from the exchanges, never a cache
+        if (
+            abs(current_buy_price / opportunity.buy_price - 1) < PRICE_UNCHANGED_TOLERANCE
+            and abs(current_sell_price / opportunity.sell_price - 1) < PRICE_UNCHANGED_TOLERANCE
+        ):
+            current_net_profit = net_profit
+        else:
+            current_profit = await calculate_profit(
+                pair, buy_exchange, sell_exchange, trade_amount,
+                buy_price=current_buy_price, sell_price=current_sell_price
+            )
+            current_net_profit = current_profit['net_profit']
         
         # 2. CHECK USDT BALANCE ON BUY EXCHANGE
-        buy_balance = await exchanges[buy_exchange].fetch_balance()
         usdt_available = buy_balance.get(quote_currency, {}).get('free', 0)
         
         if usdt_available < trade_amount:
@@ -69,13 +156,12 @@ async def execute_arbitrage(
                 f"   Shortfall: ${trade_amount - usdt_available:.2f}"
             )
             logger.error(error_msg)
-            await send_telegram_alert(error_msg)
+            queue_alert(error_msg)
             return False, error_msg
         
-        logger.info(f"✅ {quote_currency} balance check passed on {buy_exchange}: ${usdt_available:.2f}")
+        logger.info("✅ %s balance check passed on %s: $%.2f", quote_currency, buy_exchange, usdt_available)
         
         # 3. CHECK TOKEN BALANCE ON SELL EXCHANGE
-        sell_balance = await exchanges[sell_exchange].fetch_balance()
         token_available = sell_balance.get(base_currency, {}).get('free', 0)
         
         if token_available < quantity:
@@ -86,81 +172,65 @@ async def execute_arbitrage(
                 f"   Shortfall: {quantity - token_available:.8f} {base_currency}"
             )
             logger.error(error_msg)
-            await send_telegram_alert(error_msg)
+            queue_alert(error_msg)
             return False, error_msg
         
-        logger.info(f"✅ {base_currency} balance check passed on {sell_exchange}: {token_available:.8f}")
+        logger.info("✅ %s balance check passed on %s: %.8f", base_currency, sell_exchange, token_available)
         
-        # 4. RE-VERIFY PRICES HAVEN'T MOVED UNFAVORABLY
-        current_buy_price = await get_price(buy_exchange, pair)
-        current_sell_price = await get_price(sell_exchange, pair)
-        
-        # Recalculate profit with current prices
-        current_profit = await calculate_profit(
-            pair, buy_exchange, sell_exchange, trade_amount
-        )
-        
-        if current_profit['net_profit'] <= 0:
+        # 4. RE-VERIFY PRICES HAVEN'T MOVED UNFAVORABLY (profit recalculated with current prices)
+        if current_net_profit <= 0:
             error_msg = (
                 f"❌ PRICE MOVED - Trade no longer profitable!\\n"
-                f"   Original profit: ${opportunity['net_profit']:.2f}\\n"
-                f"   Current profit: ${current_profit['net_profit']:.2f}\\n"
-                f"   Buy price: ${opportunity['buy_price']:.2f} → ${current_buy_price:.2f}\\n"
-                f"   Sell price: ${opportunity['sell_price']:.2f} → ${current_sell_price:.2f}"
+                f"   Original profit: ${net_profit:.2f}\\n"
+                f"   Current profit: ${current_net_profit:.2f}\\n"
+                f"   Buy price: ${opportunity.buy_price:.2f} → ${current_buy_price:.2f}\\n"
+                f"   Sell price: ${opportunity.sell_price:.2f} → ${current_sell_price:.2f}"
             )
             logger.error(error_msg)
-            await send_telegram_alert(error_msg)
+            queue_alert(error_msg)
             return False, error_msg
         
-        logger.info(f"✅ Price re-verification passed: Still profitable at ${current_profit['net_profit']:.2f}")
+        logger.info("✅ Price re-verification passed: Still profitable at $%.2f", current_net_profit)
         
         # All validation passed - proceed with execution
-        logger.info(f"🚀 ALL PRE-CHECKS PASSED - Executing trade for {pair}")
-        await send_telegram_alert(
+        logger.info("🚀 ALL PRE-CHECKS PASSED - Executing trade for %s", pair)
+        queue_alert(
             f"🚀 Executing trade:\\n"
             f"   Pair: {pair}\\n"
             f"   Buy: {quantity:.8f} on {buy_exchange} @ ${current_buy_price:.2f}\\n"
             f"   Sell: {quantity:.8f} on {sell_exchange} @ ${current_sell_price:.2f}\\n"
-            f"   Expected profit: ${current_profit['net_profit']:.2f}"
+            f"   Expected profit: ${current_net_profit:.2f}"
         )
         
         # STEP 1: Place BUY order
-        logger.info(f"📥 Placing BUY order on {buy_exchange}")
+        logger.info("📥 Placing BUY order on %s", buy_exchange)
         buy_order = await exchanges[buy_exchange].create_market_buy_order(
             symbol=pair,
             amount=quantity
         )
         
-        await asyncio.sleep(1)
-        
         # Verify buy filled
-        buy_status = await exchanges[buy_exchange].fetch_order(
-            buy_order['id'], pair
-        )
+        buy_status = await _wait_filled(exchanges[buy_exchange], buy_order['id'], pair)
         
         if buy_status['status'] != 'closed':
             raise Exception(f"Buy order not filled: {buy_status['status']}")
         
-        logger.info(f"✅ Buy order filled: {buy_status['filled']} @ {buy_status.get('average', 'N/A')}")
+        logger.info("✅ Buy order filled: %s @ %s", buy_status['filled'], buy_status.get('average', 'N/A'))
         
         # STEP 2: Place SELL order
-        logger.info(f"📤 Placing SELL order on {sell_exchange}")
+        logger.info("📤 Placing SELL order on %s", sell_exchange)
         sell_order = await exchanges[sell_exchange].create_market_sell_order(
             symbol=pair,
             amount=quantity
         )
         
-        await asyncio.sleep(1)
-        
         # Verify sell filled
-        sell_status = await exchanges[sell_exchange].fetch_order(
-            sell_order['id'], pair
-        )
+        sell_status = await _wait_filled(exchanges[sell_exchange], sell_order['id'], pair)
         
         if sell_status['status'] != 'closed':
             raise Exception(f"Sell order not filled: {sell_status['status']}")
         
-        logger.info(f"✅ Sell order filled: {sell_status['filled']} @ {sell_status.get('average', 'N/A')}")
+        logger.info("✅ Sell order filled: %s @ %s", sell_status['filled'], sell_status.get('average', 'N/A'))
         
         # Calculate actual profit
         actual_buy_cost = buy_status['cost'] + buy_status.get('fee', {}).get('cost', 0)
@@ -168,9 +238,10 @@ async def execute_arbitrage(
         actual_profit = actual_sell_revenue - actual_buy_cost
         
         # Record trade
+        completed_ns = time.time_ns()
         trade_record = {
-            'trade_id': f"trade_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'timestamp': datetime.now().isoformat(),
+            'trade_id': f"trade_{completed_ns}_{next(_trade_seq)}",
+            'timestamp': datetime.fromtimestamp(completed_ns / 1e9).isoformat(),
             'pair': pair,
             'quantity': quantity,
             'trade_amount_usd': trade_amount,
@@ -204,12 +275,13 @@ async def execute_arbitrage(
         )
         
         logger.info(success_msg)
-        await send_telegram_alert(success_msg)
+        queue_alert(success_msg)
+        await save_trade_record(trade_record)
         
         return True, trade_record
         
     except Exception as e:
         error_msg = f"❌ Trade execution failed: {str(e)}"
         logger.error(error_msg, exc_info=True)
-        await send_telegram_alert(error_msg)
+        queue_alert(error_msg)
         return False, str(e)
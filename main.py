@@ -8,9 +8,10 @@ from utils.logger import setup_logger
 from engine.exchange_manager import ExchangeManager
 from engine.fee_manager import FeeManager
 from engine.opportunity_detector import OpportunityDetector
+from engine.profit_kernel import warm_up as warm_up_profit_kernel
 from bot.telegram_bot import ArbitrageBot
-import json
 from config import CONFIG_FILE, DATA_DIR
+from utils.json_io import read_json, write_json
 
 # Load environment variables
 load_dotenv()
@@ -22,7 +23,7 @@ logger = setup_logger()
 async def initialize():
     """Initialize data directory and config files."""
     # Create data directory
-    DATA_DIR.mkdir(exist_ok=True)
+    await asyncio.to_thread(DATA_DIR.mkdir, exist_ok=True)
     
     # Check environment variables
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -38,15 +39,13 @@ async def initialize():
         return None, None, None, None, None
     
     # Load config
-    if CONFIG_FILE.exists():
-        with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
+    if await asyncio.to_thread(CONFIG_FILE.exists):
+        config = await asyncio.to_thread(read_json, CONFIG_FILE)
     else:
         logger.warning("Config file not found, using defaults")
-        from config import DEFAULT_CONFIG
-        config = DEFAULT_CONFIG
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
+        from config import default_config
+        config = default_config()
+        await asyncio.to_thread(write_json, CONFIG_FILE, config)
     
     logger.info("Configuration loaded")
     
@@ -72,6 +71,8 @@ async def initialize():
         logger.info("Position tracker loaded")
     
     opportunity_detector = OpportunityDetector(exchange_manager, fee_manager, config)
+    # Compile the profit kernel now rather than during the first scan
+    await asyncio.to_thread(warm_up_profit_kernel)
     
     # Initialize bot
     bot = ArbitrageBot(bot_token, exchange_manager, opportunity_detector)
@@ -0,0 +1,34 @@
+"""
+Bounded-concurrency helper for running many coroutines.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Iterable
+
+
+async def run_coros_pool(coros: Iterable[Awaitable], limit: int) -> AsyncIterator[Any]:
+    """
+    Run coroutines with at most `limit` in flight, yielding results in completion order.
+    
+    A new coroutine starts as soon as any running one finishes, so one slow request
+    doesn't hold up a whole batch. An exception from a coroutine is raised to the
+    caller; coroutines still running at that point are cancelled and the rest
+    are never started.
+    """
+    coros = iter(coros)
+    pending = set()
+    try:
+        while True:
+            for coro in coros:
+                pending.add(asyncio.ensure_future(coro))
+                if len(pending) >= limit:
+                    break
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        for coro in coros:
+            coro.close()  # never started
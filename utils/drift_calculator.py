@@ -4,6 +4,8 @@ Drift Calculator - Calculates inventory drift and rebalancing needs.
 import logging
 from typing import Dict, List
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,36 +29,44 @@ def calculate_drift(
             'rebalancing_suggestions': [...]
         }
     """
-    # Calculate total value per exchange (in USDT equivalent)
-    current_totals = {}
-    initial_totals = {}
+    # One (exchanges x assets) matrix per side; missing holdings are 0
+    exchanges = list(current_positions)
+    assets = sorted(
+        {asset for positions in current_positions.values() for asset in positions}
+        | {asset for positions in initial_balances.values() for asset in positions}
+    )
+    asset_index = {asset: i for i, asset in enumerate(assets)}
+    current = _positions_matrix(current_positions, exchanges, asset_index)
+    initial = _positions_matrix(initial_balances, exchanges, asset_index)
     
-    for exchange in current_positions:
-        current_totals[exchange] = _calculate_usdt_value(current_positions[exchange])
-        initial_totals[exchange] = _calculate_usdt_value(initial_balances.get(exchange, {}))
+    # Calculate total value per exchange (in USDT equivalent)
+    current_totals = _usdt_values(current, asset_index)
+    initial_totals = _usdt_values(initial, asset_index)
     
     # Calculate overall drift
-    total_current = sum(current_totals.values())
-    total_initial = sum(initial_totals.values())
+    total_current = float(current_totals.sum())
+    total_initial = float(initial_totals.sum())
     
     overall_drift_percent = 0
     if total_initial > 0:
         overall_drift_percent = abs((total_current - total_initial) / total_initial) * 100
     
     # Calculate per-exchange drift
-    by_exchange = {}
-    for exchange in current_totals:
-        initial = initial_totals.get(exchange, 0)
-        current = current_totals[exchange]
-        
-        if initial > 0:
-            drift = abs((current - initial) / initial) * 100
-            by_exchange[exchange] = round(drift, 2)
-        else:
-            by_exchange[exchange] = 0.0
+    by_exchange = {
+        exchange: round(drift, 2)
+        for exchange, drift in zip(exchanges, _drift_percent(current_totals, initial_totals).tolist())
+    }
     
-    # Calculate per-asset drift across all exchanges
-    by_asset = _calculate_asset_drift(current_positions, initial_balances)
+    # Calculate per-asset drift across all exchanges (initial side includes
+    # exchanges that are no longer in the current positions)
+    if set(initial_balances) <= set(exchanges):
+        initial_all = initial
+    else:
+        initial_all = _positions_matrix(initial_balances, list(initial_balances), asset_index)
+    by_asset = {
+        asset: round(drift, 2)
+        for asset, drift in zip(assets, _drift_percent(current.sum(axis=0), initial_all.sum(axis=0)).tolist())
+    }
     
     # Determine if rebalancing is needed
     needs_rebalancing = overall_drift_percent > 15.0 or any(d > 20.0 for d in by_exchange.values())
@@ -91,38 +101,37 @@ def _calculate_usdt_value(positions: Dict[str, float]) -> float:
     return positions.get('USDT', 0)
 
 
-def _calculate_asset_drift(
-    current: Dict[str, Dict[str, float]],
-    initial: Dict[str, Dict[str, float]]
-) -> Dict[str, float]:
-    """Calculate drift per asset across all exchanges."""
-    by_asset = {}
-    
-    # Get all unique assets
-    all_assets = set()
-    for positions in current.values():
-        all_assets.update(positions.keys())
-    for positions in initial.values():
-        all_assets.update(positions.keys())
-    
-    for asset in all_assets:
-        # Sum current holdings across exchanges
-        current_total = sum(
-            positions.get(asset, 0) for positions in current.values()
-        )
-        
-        # Sum initial holdings across exchanges
-        initial_total = sum(
-            positions.get(asset, 0) for positions in initial.values()
-        )
-        
-        if initial_total > 0:
-            drift = abs((current_total - initial_total) / initial_total) * 100
-            by_asset[asset] = round(drift, 2)
-        else:
-            by_asset[asset] = 0.0
-    
-    return by_asset
+def _positions_matrix(
+    positions: Dict[str, Dict[str, float]],
+    exchanges: List[str],
+    asset_index: Dict[str, int]
+) -> np.ndarray:
+    """Build an (exchanges x assets) array of holdings; missing entries are 0."""
+    matrix = np.zeros((len(exchanges), len(asset_index)))
+    for row, exchange in enumerate(exchanges):
+        for asset, amount in positions.get(exchange, {}).items():
+            matrix[row, asset_index[asset]] = amount
+    return matrix
+
+
+def _usdt_values(matrix: np.ndarray, asset_index: Dict[str, int]) -> np.ndarray:
+    """
+    Total USDT value per row of a positions matrix.
+    Like _calculate_usdt_value, only the USDT balance is counted for now.
+    """
+    column = asset_index.get('USDT')
+    if column is None:
+        return np.zeros(matrix.shape[0])
+    return matrix[:, column]
+
+
+def _drift_percent(current: np.ndarray, initial: np.ndarray) -> np.ndarray:
+    """Elementwise abs((current - initial) / initial) * 100, 0 where initial <= 0."""
+    drift = np.divide(
+        np.abs(current - initial), initial,
+        out=np.zeros_like(current), where=initial > 0
+    )
+    return drift * 100
 
 
 def _generate_rebalancing_suggestions(
@@ -0,0 +1,59 @@
+"""
+JSON file helpers - use orjson when installed, stdlib json otherwise.
+
+The file helpers block; call them through asyncio.to_thread from async code.
+"""
+import json
+import os
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dump_json(data, indent: bool = True) -> bytes:
+    """Serialize data to JSON bytes."""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, indent=2 if indent else None).encode()
+
+
+def read_json(path):
+    """Read and parse a JSON file."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def write_bytes_atomic(path, content: bytes):
+    """
+    Write content to a temp file next to path, then rename it into place.
+    
+    Each call uses its own temp file, so concurrent writers to the same path
+    don't clobber each other; the last rename wins.
+    """
+    path = os.fspath(path)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp'
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json(path, data, indent: bool = True):
+    """Serialize data to a JSON file."""
+    write_bytes_atomic(path, dump_json(data, indent))
@@ -1,23 +1,45 @@
 """
 Logger utility with proper formatting.
 """
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from config import LOG_FORMAT, LOG_LEVEL
 
+# Loggers already configured by setup_logger, by name
+_configured = {}
+
 
 def setup_logger(name: str = "arbitrage_bot") -> logging.Logger:
     """
     Set up and configure logger instance.
     
+    Only the first call for a name does any work; later calls return the same logger.
+    The calling thread still merges the message arguments and formats any exception
+    traceback (QueueHandler.prepare); a background thread applies LOG_FORMAT and writes
+    to stdout, so logging from the event loop never waits on the console.
+    
     Args:
         name: Logger name
     
     Returns:
         Configured logger
     """
+    logger = _configured.get(name)
+    if logger is not None:
+        return logger
+    
+    # Skip LogRecord fields the format never uses
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, LOG_LEVEL.upper()))
+    # Our handler is the only output; don't emit records again through root
+    logger.propagate = False
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
@@ -27,8 +49,12 @@ def setup_logger(name: str = "arbitrage_bot") -> logging.Logger:
     formatter = logging.Formatter(LOG_FORMAT)
     console_handler.setFormatter(formatter)
     
-    # Add handler if not already added
-    if not logger.handlers:
-        logger.addHandler(console_handler)
+    # The logger enqueues prepared records; the listener thread hands them to the console handler
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # drains queued records on exit
+    logger.addHandler(QueueHandler(log_queue))
     
+    _configured[name] = logger
     return logger
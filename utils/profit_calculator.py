@@ -2,9 +2,35 @@
 Profit calculator for equal trade amounts.
 """
 import logging
+import time
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Fee rates barely change within a session - reuse them for this long
+FEE_RATE_CACHE_TTL_SECONDS = 60 * 60
+
+# (exchange, pair, 'taker'|'maker') -> (time.monotonic() when fetched, fee percentage)
+_fee_rate_cache = {}
+
+
+def invalidate_fee_rate_cache():
+    """Drop all cached fee rates so the next calculation fetches them again."""
+    _fee_rate_cache.clear()
+
+
+async def _get_fee_rate(get_fee, exchange: str, pair: str, side: str) -> float:
+    """Get a fee percentage, awaiting get_fee only when the cached rate is missing or stale."""
+    key = (exchange, pair, side)
+    cached = _fee_rate_cache.get(key)
+    now = time.monotonic()
+    if cached and now - cached[0] < FEE_RATE_CACHE_TTL_SECONDS:
+        return cached[1]
+    
+    fee = await get_fee(exchange, pair)
+    _fee_rate_cache[key] = (now, fee)
+    return fee
+
 
 async def calculate_profit(
     pair: str,
@@ -14,7 +40,9 @@ async def calculate_profit(
     exchanges: dict,
     get_taker_fee,
     get_maker_fee,
-    get_price
+    get_price,
+    buy_price: Optional[float] = None,
+    sell_price: Optional[float] = None
 ) -> dict:
     """
     Calculate profit with EQUAL trade amounts
@@ -29,13 +57,17 @@ async def calculate_profit(
         get_taker_fee: Function to get taker fee
         get_maker_fee: Function to get maker fee
         get_price: Function to get current price
+        buy_price: Current buy price, if the caller already has it
+        sell_price: Current sell price, if the caller already has it
     
     Returns:
         Dict with profit calculations
     """
-    # Fetch current prices
-    buy_price = await get_price(buy_exchange, pair)
-    sell_price = await get_price(sell_exchange, pair)
+    # Fetch current prices the caller didn't pass in
+    if buy_price is None:
+        buy_price = await get_price(buy_exchange, pair)
+    if sell_price is None:
+        sell_price = await get_price(sell_exchange, pair)
     
     # Calculate quantity based on TRADE AMOUNT
     # If trade_amount_usd = $100 and BTC price = $40,000
@@ -44,20 +76,19 @@ async def calculate_profit(
     
     # Buy side calculation
     buy_cost = trade_amount_usd
-    buy_fee_rate = await get_taker_fee(buy_exchange, pair) / 100
+    buy_fee_rate = await _get_fee_rate(get_taker_fee, buy_exchange, pair, 'taker') / 100
     buy_fee_usd = buy_cost * buy_fee_rate
     total_buy_cost = buy_cost + buy_fee_usd
     
     # Sell side calculation
     sell_revenue = quantity * sell_price
-    sell_fee_rate = await get_maker_fee(sell_exchange, pair) / 100
+    sell_fee_rate = await _get_fee_rate(get_maker_fee, sell_exchange, pair, 'maker') / 100
     sell_fee_usd = sell_revenue * sell_fee_rate
-    total_sell_revenue = sell_revenue - sell_fee_usd
     
-    # Net profit
+    # Net profit = (revenue - sell fee) - (cost + buy fee)
     gross_profit = sell_revenue - buy_cost
-   total_fees = buy_fee_usd + sell_fee_usd
-    net_profit = total_sell_revenue - total_buy_cost
+    total_fees = buy_fee_usd + sell_fee_usd
+    net_profit = gross_profit - total_fees
     
     return {
         'quantity': quantity,
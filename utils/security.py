@@ -2,6 +2,7 @@
 API key encryption and security utilities.
 """
 import os
+from typing import Dict
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
 
@@ -22,6 +23,12 @@ def encrypt_api_key(api_key: str) -> str:
     return cipher.encrypt(api_key.encode()).decode()
 
 
+def encrypt_api_keys(api_keys: Dict[str, str]) -> Dict[str, str]:
+    """Encrypt several API credentials with a single cipher."""
+    cipher = get_cipher()
+    return {name: cipher.encrypt(value.encode()).decode() for name, value in api_keys.items()}
+
+
 def decrypt_api_key(encrypted_key: str) -> str:
     """Decrypt an API key."""
     cipher = get_cipher()